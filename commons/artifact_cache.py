@@ -0,0 +1,193 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from commons.shared_store import shared_store
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Without fcntl, keys are locked per process on one of this many locks
+LOCK_STRIPES = 64
+
+# Total size of the entries, kept in the shared store so that every worker
+# process sees the writes of the others
+SIZE_KEY = "artifact-cache:bytes"
+# Eviction frees space down to this fraction of max_bytes, so the directory
+# is only scanned once every so many writes
+EVICT_TO = 0.9
+
+
+class ArtifactCache:
+    """
+    Disk-backed, content-addressed cache for rendered responses.
+
+    Entries are plain files named after the hash of the inputs that produced
+    them, so every worker process on the host can serve them (the OS page
+    cache is shared). Least recently used entries are evicted once the cache
+    grows past `max_bytes`; the running total is tracked on every write, so
+    only then is the directory scanned.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    @staticmethod
+    def make_key(*parts):
+        raw = "\x1f".join(str(part) for part in parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            # Bump the mtime so eviction treats this entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, content):
+        with self.open_for_write(key) as cache_file:
+            cache_file.write(content)
+        return self.path_for(key)
+
+    @contextmanager
+    def open_for_write(self, key):
+        """
+        Yield a binary file to write an entry into. The entry only becomes
+        visible once the block completes without errors.
+        """
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file and rename, so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                yield tmp_file
+                tmp_file.flush()
+                size = os.fstat(tmp_file.fileno()).st_size
+            try:
+                size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        if shared_store.get(SIZE_KEY) is None:
+            # Nothing tracked yet (e.g. entries left by an earlier run)
+            self.evict()
+        elif shared_store.incr(SIZE_KEY, size) > self.max_bytes:
+            self.evict()
+
+    def lock_path_for(self, key):
+        return self.path_for(key).with_name(f".lock-{key}")
+
+    @contextmanager
+    def lock(self, key, timeout):
+        """
+        Hold an exclusive lock on `key` while producing its entry, so that
+        concurrent identical requests from any thread or worker process on
+        the host wait for one of them to render it instead of each rendering
+        it themselves. After `timeout` seconds of waiting, the block runs
+        without the lock.
+        """
+        if fcntl is None:
+            key_lock = self._key_locks[int(key[:8], 16) % LOCK_STRIPES]
+            locked = key_lock.acquire(timeout=timeout)
+            try:
+                yield
+            finally:
+                if locked:
+                    key_lock.release()
+            return
+
+        path = self.lock_path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = self.acquire_file_lock(path, time.monotonic() + timeout)
+        try:
+            yield
+        finally:
+            if lock_file is not None:
+                # Removed before it is released, so lock files never outlive
+                # their lock, whether or not an entry was written
+                path.unlink()
+                lock_file.close()
+
+    @staticmethod
+    def acquire_file_lock(path, deadline):
+        """
+        Open and flock the lock file at `path`, returning it, or None once
+        `deadline` passes.
+        """
+        while True:
+            # flock locks belong to the open file, so separate opens exclude
+            # each other across threads as well as processes
+            lock_file = open(path, "a")
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        lock_file.close()
+                        return None
+                    time.sleep(0.01)
+
+            # The previous holder removes the file it locked, so only a lock
+            # on the file still at `path` excludes the others
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(lock_file.fileno()).st_ino:
+                return lock_file
+            lock_file.close()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.glob("*/*"):
+                if path.name.startswith("."):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            if total > self.max_bytes:
+                for _, size, path in entries:
+                    if total <= self.max_bytes * EVICT_TO:
+                        break
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+            shared_store.set(SIZE_KEY, total)
+
+
+artifact_cache = ArtifactCache(
+    settings.ARTIFACT_CACHE_DIR, settings.ARTIFACT_CACHE_MAX_BYTES
+)
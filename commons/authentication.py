@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from commons.shared_store import shared_store
+
+VERSION_PREFIX = "user-version:"
+
+
+class UserCache:
+    """
+    In-process LRU cache of the users JWTAuthentication loads, keyed by the
+    token's user id (the slug).
+
+    Entries hold the user's column values and are rebuilt into a fresh model
+    instance on every hit, so requests never share an instance. Each entry
+    is stored with the user's version from commons.shared_store; saving or
+    deleting a user bumps it (see users.signals), which invalidates the
+    cached copy in every worker process. `ttl` bounds how stale an entry can
+    get if a change bypasses the signals (e.g. QuerySet.update()).
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version(user_id):
+        return shared_store.get(f"{VERSION_PREFIX}{user_id}", 0)
+
+    def get(self, user_id, version, model):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, entry_version, db, values = entry
+            if entry_version != version or expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        return model.from_db(
+            db, [field.attname for field in model._meta.concrete_fields], values
+        )
+
+    def set(self, user_id, version, user):
+        values = [getattr(user, field.attname) for field in user._meta.concrete_fields]
+        with self._lock:
+            self._entries[user_id] = (
+                time.monotonic() + self.ttl,
+                version,
+                user._state.db,
+                values,
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        def bump():
+            with self._lock:
+                self._entries.pop(user_id, None)
+            shared_store.incr(f"{VERSION_PREFIX}{user_id}")
+
+        # After commit, so a request can't re-cache the row as it was before
+        transaction.on_commit(bump)
+
+
+user_cache = UserCache(settings.USER_CACHE_TTL, settings.USER_CACHE_MAX_SIZE)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves users from `user_cache`."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        # Read before loading the user, so a save in between invalidates it
+        version = user_cache.version(user_id)
+        user = user_cache.get(user_id, version, self.user_model)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, version, user)
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                "The user's password has been changed.", code="password_changed"
+            )
+        return user
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    # drf-spectacular matches authentication classes exactly, not by subclass
+    target_class = "commons.authentication.CachedJWTAuthentication"
@@ -0,0 +1,64 @@
+import re
+import resource
+import sys
+import tracemalloc
+
+# Peak memory of one request, measured one of two ways:
+#
+# - "tracemalloc": peak of Python allocations made while the request runs.
+#   Precise and portable, but tracing slows allocation-heavy code noticeably.
+# - "rss": growth of the process's peak resident set size. Costs nothing while
+#   the request runs and includes native memory (numpy, pyarrow, reportlab's
+#   C code); on Linux the kernel's peak counter is reset per request.
+#
+# Both are process-wide, so only one request per process is measured at a time.
+
+
+def read_status(field):
+    """A /proc/self/status field, in bytes."""
+    with open("/proc/self/status") as status:
+        match = re.search(rf"^{field}:\s+(\d+) kB", status.read(), re.MULTILINE)
+    return int(match.group(1)) * 1024
+
+
+class TracemallocTracker:
+    def start(self):
+        self.was_tracing = tracemalloc.is_tracing()
+        if self.was_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        self.baseline = tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        if not self.was_tracing:
+            tracemalloc.stop()
+        return max(0, peak - self.baseline)
+
+
+class RssTracker:
+    def start(self):
+        try:
+            # Writing 5 to clear_refs resets VmHWM to the current RSS
+            with open("/proc/self/clear_refs", "w") as clear_refs:
+                clear_refs.write("5")
+            self.baseline = read_status("VmRSS")
+            self.peak = lambda: read_status("VmHWM")
+        except OSError:
+            # Elsewhere only the lifetime peak is available, so growth is
+            # only seen when the request sets a new high
+            self.peak = self.max_rss
+            self.baseline = self.peak()
+
+    @staticmethod
+    def max_rss():
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    def stop(self):
+        return max(0, self.peak() - self.baseline)
+
+
+TRACKERS = {"tracemalloc": TracemallocTracker, "rss": RssTracker}
@@ -0,0 +1,201 @@
+import hmac
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from commons.shared_store import shared_store
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Upper bounds (bytes) of the memory histogram buckets, 1 MiB to 4 GiB
+MEMORY_BUCKETS = tuple(2**power for power in range(20, 33, 2))
+
+# Prefix of the shared store keys holding metric series
+KEY_PREFIX = "metric:"
+
+
+def format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def series(name, labels):
+    """Prometheus series name, e.g. `name{route="data/dummy/",status="200"}`."""
+    if not labels:
+        return name
+    return series_key(name, tuple(labels.items()))
+
+
+@lru_cache(maxsize=4096)
+def series_key(name, labels):
+    # `labels` is a tuple of (label, value) pairs, so results can be cached
+    pairs = ",".join(
+        '{}="{}"'.format(
+            label,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for label, value in labels
+    )
+    return f"{name}{{{pairs}}}"
+
+
+@lru_cache(maxsize=1024)
+def histogram_keys(name, labels, buckets):
+    labels = dict(labels)
+    bucket_keys = [
+        (bound, series(f"{name}_bucket", {**labels, "le": format_value(bound)}))
+        for bound in buckets
+    ]
+    bucket_keys.append(
+        (float("inf"), series(f"{name}_bucket", {**labels, "le": "+Inf"}))
+    )
+    return bucket_keys, series(f"{name}_sum", labels), series(f"{name}_count", labels)
+
+
+def sample_order(key):
+    # Histogram buckets must be listed in increasing `le` order, which the
+    # store's string ordering doesn't give. `le` is always the last label.
+    head, found, bound = key.rpartition('le="')
+    if not found:
+        return key, 0
+    bound = bound[: -len('"}')]
+    return head, float("inf") if bound == "+Inf" else float(bound)
+
+
+class Metrics:
+    """
+    Counters and histograms aggregated across every worker on the host.
+
+    Updates only touch an in-process dict; it is flushed into the shared
+    store (one transaction) at most every `flush_interval` seconds and before
+    every scrape, so recording a request costs a few dict updates.
+    """
+
+    def __init__(self, flush_interval=1.0):
+        self.flush_interval = flush_interval
+        self.families = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def describe(self, name, kind, help_text):
+        self.families[name] = (kind, help_text)
+
+    def inc(self, name, labels=None, amount=1):
+        key = series(name, labels)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+
+    def observe(self, name, value, labels=None, buckets=LATENCY_BUCKETS):
+        bucket_keys, sum_key, count_key = histogram_keys(
+            name, tuple((labels or {}).items()), buckets
+        )
+        pending = self._pending
+        with self._lock:
+            # Buckets are cumulative, as Prometheus expects
+            for bound, key in bucket_keys:
+                if value <= bound:
+                    pending[key] = pending.get(key, 0) + 1
+            pending[sum_key] = pending.get(sum_key, 0) + value
+            pending[count_key] = pending.get(count_key, 0) + 1
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if pending:
+            shared_store.incr_many(
+                {KEY_PREFIX + key: amount for key, amount in pending.items()}
+            )
+
+    def family_of(self, name):
+        if name in self.families:
+            return name
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and name[: -len(suffix)] in self.families:
+                return name[: -len(suffix)]
+        return name
+
+    def render(self):
+        """Every series in the Prometheus text exposition format."""
+        self.flush()
+
+        grouped = {}
+        samples = [
+            (key[len(KEY_PREFIX) :], value)
+            for key, value in shared_store.items(KEY_PREFIX)
+        ]
+        for key, value in sorted(samples, key=lambda sample: sample_order(sample[0])):
+            family = self.family_of(key.split("{", 1)[0])
+            grouped.setdefault(family, []).append(f"{key} {format_value(value)}")
+
+        lines = []
+        for family, samples in grouped.items():
+            if family in self.families:
+                kind, help_text = self.families[family]
+                lines.append(f"# HELP {family} {help_text}")
+                lines.append(f"# TYPE {family} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe(
+    "http_requests_total", "counter", "Requests handled, by route, method and status."
+)
+metrics.describe(
+    "http_request_duration_seconds",
+    "histogram",
+    "Time until the response was returned by the view (streamed bodies excluded).",
+)
+metrics.describe(
+    "http_request_phase_seconds",
+    "histogram",
+    "Time spent in each phase of a request, by route, format and data types.",
+)
+metrics.describe(
+    "http_request_peak_memory_bytes",
+    "histogram",
+    "Peak memory of tracked requests, by route, format, data types and range.",
+)
+metrics.describe(
+    "http_response_size_bytes_total",
+    "counter",
+    "Bytes in responses with a known length, by route, method and status.",
+)
+
+
+# Clients allowed to scrape without a token
+LOCAL_ADDRESSES = ("127.0.0.1", "::1")
+
+
+def metrics_view(request):
+    # Scrapers authenticate with a bearer token when METRICS_TOKEN is set;
+    # otherwise only local scrapers and staff sessions can see the metrics
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
+    else:
+        # Behind a reverse proxy every client looks local, but carries the
+        # proxy's X-Forwarded-For header
+        local = (
+            request.META.get("REMOTE_ADDR") in LOCAL_ADDRESSES
+            and "X-Forwarded-For" not in request.headers
+        )
+        user = getattr(request, "user", None)
+        allowed = local or bool(user and user.is_authenticated and user.is_staff)
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,19 +1,277 @@
+import hmac
 import logging
+import random
+import threading
 import time
 
-from rest_framework.metadata import BaseMetadata
+from django.conf import settings
+from django.http import FileResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from commons.authentication import CachedJWTAuthentication
+from commons.memory import TRACKERS
+from commons.metrics import MEMORY_BUCKETS, metrics
+from commons.profiling import StackSampler
+from commons.timing import PhaseTimer, get_timer
 
 logger = logging.getLogger(__name__)
 
 
 class RequestTimingMiddleware:
+    """
+    Records every request in commons.metrics: a latency histogram and
+    request/byte counters per route, method and status. A sample of requests
+    (REQUEST_LOG_SAMPLE_RATE) is also logged.
+
+    Views can break the time down with the request's `phase_timer` (see
+    commons.timing); the phases are returned in the Server-Timing header and
+    recorded per phase, format and data types.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.log_sample_rate = settings.REQUEST_LOG_SAMPLE_RATE
 
     def __call__(self, request):
-        start_time = time.time()
+        request.phase_timer = timer = PhaseTimer()
+        start_time = time.perf_counter()
         response = self.get_response(request)
-        end_time = time.time()
-        duration = end_time - start_time
-        logger.info(f"Request to {request.path} took {duration:.4f} seconds.")
+        duration = time.perf_counter() - start_time
+
+        # The URL pattern rather than the path, so series stay bounded
+        match = request.resolver_match
+        route = match.route if match else "unmatched"
+        labels = {
+            "route": route,
+            "method": request.method,
+            "status": response.status_code,
+        }
+        metrics.inc("http_requests_total", labels)
+        metrics.observe("http_request_duration_seconds", duration, labels)
+
+        size = response.get("Content-Length")
+        if size is None and not response.streaming:
+            size = len(response.content)
+        if size is not None:
+            metrics.inc("http_response_size_bytes_total", labels, int(size))
+
+        if timer.phases:
+            response["Server-Timing"] = (
+                f"{timer.header()}, total;dur={duration * 1000:.1f}"
+            )
+            # Streamed bodies are produced while they are sent, so their
+            # phases are only complete once the stream is exhausted
+            if response.streaming and not isinstance(response, FileResponse):
+                response.streaming_content = self.timed_stream(
+                    response.streaming_content, timer, route
+                )
+            else:
+                self.record_phases(timer, route)
+        metrics.maybe_flush()
+
+        if self.log_sample_rate and random.random() < self.log_sample_rate:
+            logger.info(f"Request to {request.path} took {duration:.4f} seconds.")
+        return response
+
+    def timed_stream(self, content, timer, route):
+        try:
+            with timer.phase("transfer"):
+                yield from content
+        finally:
+            self.record_phases(timer, route)
+
+    @staticmethod
+    def record_phases(timer, route):
+        labels = {"route": route, "format": "", "types": "", **timer.labels}
+        for name, seconds in timer.phases.items():
+            metrics.observe(
+                "http_request_phase_seconds", seconds, {**labels, "phase": name}
+            )
+
+
+class ObservedStream:
+    """Streamed body that calls `on_close` once it is exhausted or closed."""
+
+    def __init__(self, content, on_close):
+        self.content = content
+        self.on_close = on_close
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            yield from self.content
+        finally:
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.on_close()
+
+
+class SamplingProfilerMiddleware:
+    """
+    Records a stack-sampling profile (commons.profiling) of selected requests
+    as a data.RequestProfile, browsable from the admin.
+
+    A request is profiled when it sends the PROFILE_HEADER header, or at
+    random with PROFILE_SAMPLE_RATE. The header is only honoured when its
+    value is PROFILE_TOKEN or the request comes from a staff user (session
+    or JWT), which is checked before the sampler starts. Each process
+    profiles one request at a time.
+    """
+
+    _busy = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = settings.PROFILE_HEADER
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+        self.interval = settings.PROFILE_INTERVAL
+        self.token = settings.PROFILE_TOKEN
+
+    def __call__(self, request):
+        requested = self.header in request.headers and self.is_authorized(request)
+        sampled = bool(self.sample_rate) and random.random() < self.sample_rate
+        if not (requested or sampled) or not self._busy.acquire(blocking=False):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        start_time = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            sampler.stop()
+            self._busy.release()
+            raise
+
+        def finish():
+            sampler.stop()
+            self._busy.release()
+            self.save_profile(
+                request, response, sampler, time.perf_counter() - start_time
+            )
+
+        # Streamed bodies are generated while being sent, so keep sampling
+        # until the stream is done
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = ObservedStream(
+                self.follow_stream(response.streaming_content, sampler), finish
+            )
+        else:
+            finish()
+        return response
+
+    def is_authorized(self, request):
+        value = request.headers[self.header]
+        if self.token and hmac.compare_digest(value, self.token):
+            return True
+
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            # API clients authenticate with a JWT, which DRF only checks
+            # inside the view
+            try:
+                authenticated = CachedJWTAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                return False
+            user = authenticated[0] if authenticated else None
+        return bool(user and user.is_staff)
+
+    @staticmethod
+    def follow_stream(content, sampler):
+        # The body may be iterated on another thread (e.g. under ASGI)
+        sampler.thread_id = threading.get_ident()
+        yield from content
+
+    @staticmethod
+    def save_profile(request, response, sampler, duration):
+        from data.models import RequestProfile
+
+        user = getattr(request, "user", None)
+        profile = RequestProfile.objects.create(
+            user=user if user and user.is_authenticated else None,
+            method=request.method,
+            path=request.path[:2048],
+            query_string=request.META.get("QUERY_STRING", ""),
+            status_code=response.status_code,
+            duration=duration,
+            sample_count=sampler.sample_count,
+        )
+        profile.file_path.parent.mkdir(parents=True, exist_ok=True)
+        profile.file_path.write_text(sampler.folded())
+
+        # Keep only the most recent profiles
+        for old_profile in RequestProfile.objects.all()[settings.PROFILE_KEEP :]:
+            old_profile.delete()
+
+
+class MemoryTrackingMiddleware:
+    """
+    Measures the peak memory of requests with the MEMORY_TRACKING tracker
+    (see commons.memory), for a MEMORY_TRACKING_SAMPLE_RATE fraction of them.
+
+    Peaks are recorded in the http_request_peak_memory_bytes histogram,
+    labelled with the route and, for /data/dummy/, the format, types and
+    range (rounded up to a power of ten). Requests peaking above
+    MEMORY_LOG_THRESHOLD bytes are logged with the exact query.
+    """
+
+    _busy = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.tracker_class = TRACKERS.get(settings.MEMORY_TRACKING)
+        self.sample_rate = settings.MEMORY_TRACKING_SAMPLE_RATE
+        self.log_threshold = settings.MEMORY_LOG_THRESHOLD
+
+    def __call__(self, request):
+        if (
+            self.tracker_class is None
+            or random.random() >= self.sample_rate
+            or not self._busy.acquire(blocking=False)
+        ):
+            return self.get_response(request)
+
+        tracker = self.tracker_class()
+        tracker.start()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            tracker.stop()
+            self._busy.release()
+            raise
+
+        def finish():
+            peak = tracker.stop()
+            self._busy.release()
+            self.record(request, peak)
+
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = ObservedStream(
+                response.streaming_content, finish
+            )
+        else:
+            finish()
         return response
+
+    def record(self, request, peak):
+        match = request.resolver_match
+        labels = {"route": match.route if match else "unmatched"}
+        timer = get_timer(request)
+        data_range = None
+        if timer is not None:
+            labels.update(timer.labels)
+            data_range = timer.details.get("range")
+        if data_range is not None:
+            labels["range"] = 10 ** len(str(max(data_range - 1, 0)))
+
+        metrics.observe(
+            "http_request_peak_memory_bytes", peak, labels, buckets=MEMORY_BUCKETS
+        )
+        if peak >= self.log_threshold:
+            logger.warning(
+                f"Request to {request.get_full_path()} peaked at "
+                f"{peak / 2**20:.1f} MiB ({settings.MEMORY_TRACKING})."
+            )
@@ -1,21 +1,32 @@
 from io import BytesIO
 from zipfile import ZipFile
 
-import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.platypus import (
-    PageBreak,
-    Paragraph,
-    SimpleDocTemplate,
-    Spacer,
-    Table,
-    TableStyle,
-)
 from rest_framework.renderers import BaseRenderer
 
+from commons.streaming import encode_json, ndjson_lines, stream_csv_zip
+
+# pyarrow, xlsxwriter and reportlab are imported inside the renderers that
+# use them: together they are most of the project's import time, and a worker
+# that never exports those formats shouldn't pay for them on boot.
+
+
+def preload():
+    """Import every renderer dependency up front (see commons.warmup)."""
+    import pyarrow.ipc  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+    import xlsxwriter  # noqa: F401
+    from reportlab.lib import colors, rl_accel, units  # noqa: F401
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas  # noqa: F401
+
+    # Loads the font metrics tables the PDF renderer measures text with
+    for font_name, _ in (
+        PdfRenderer.title_font,
+        PdfRenderer.header_font,
+        PdfRenderer.body_font,
+    ):
+        stringWidth("", font_name, 10)
+
 
 class ExcelRenderer(BaseRenderer):
     media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
@@ -26,18 +37,43 @@ class ExcelRenderer(BaseRenderer):
         if not isinstance(data, dict) or "data" not in data:
             return None
 
-        # Create an in-memory output stream for the Excel file
         output = BytesIO()
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            for data_type, data_list in data["data"].items():
-                df = pd.DataFrame(data=data_list)
-                df.columns = [col.title() for col in df.columns]
-                df.to_excel(writer, sheet_name=data_type.title(), index=False)
+        self.write_workbook(data["data"].items(), output)
+        return output.getvalue()
 
-        output.seek(0)  # Reset the stream's position to the beginning
+    @staticmethod
+    def write_workbook(shards, output):
+        """
+        Write `(data_type, rows)` chunks, grouped by type, into an xlsx
+        workbook with one sheet per type.
+
+        The workbook runs in xlsxwriter's constant_memory mode: each row is
+        flushed to a temp file as soon as the next one starts, so memory use
+        doesn't grow with the number of rows. Numbers are written as numeric
+        cells, not text.
+        """
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+        header_format = workbook.add_format({"bold": True, "border": 1})
+
+        current_type = None
+        for data_type, rows in shards:
+            if not rows:
+                continue
+            if data_type != current_type:
+                current_type = data_type
+                worksheet = workbook.add_worksheet(data_type.title())
+                worksheet.write_row(
+                    0, 0, [column.title() for column in rows[0]], header_format
+                )
+                row_index = 1
+
+            for row in rows:
+                worksheet.write_row(row_index, 0, list(row.values()))
+                row_index += 1
 
-        # Return the output stream as the response
-        return output.read()
+        workbook.close()
 
 
 class CsvRenderer(BaseRenderer):
@@ -48,122 +84,319 @@ class CsvRenderer(BaseRenderer):
         if not isinstance(data, dict) or "data" not in data:
             return None
 
-        # Create an in-memory buffer to store the zip file
-        zip_buffer = BytesIO()
+        # Same writer as the streaming export: one CSV per type in a zip
+        return b"".join(stream_csv_zip(data["data"].items()))
+
+
+def build_arrow_table(data_list):
+    import pyarrow as pa
 
-        # Create a ZipFile object
+    # Build typed Arrow columns straight from the rows, no DataFrame needed
+    columns = {key: [row[key] for row in data_list] for key in data_list[0]}
+    return pa.table(columns)
+
+
+class ArrowZipRenderer(BaseRenderer):
+    """
+    Base for columnar formats: one file per data type, bundled in a zip.
+    Subclasses implement `write_table` for their file format.
+    """
+
+    media_type = "application/zip"
+    extension = None
+
+    def write_table(self, table, sink):
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict) or "data" not in data:
+            return None
+
+        import pyarrow as pa
+
+        zip_buffer = BytesIO()
         with ZipFile(zip_buffer, "w") as zip_file:
-            # Iterate through each dataset and generate a separate CSV file for each
             for data_type, data_list in data["data"].items():
                 if not data_list:
                     continue
 
-                # Convert data to DataFrame
-                df = pd.DataFrame(data=data_list)
-                df.columns = [
-                    col.title() for col in df.columns
-                ]  # Title case the column names
+                sink = pa.BufferOutputStream()
+                self.write_table(build_arrow_table(data_list), sink)
+                file_name = f"{data_type.lower().replace(' ', '_')}.{self.extension}"
+                zip_file.writestr(file_name, sink.getvalue().to_pybytes())
 
-                # Create a BytesIO buffer for each CSV file
-                csv_buffer = BytesIO()
-                df.to_csv(csv_buffer, sep=",", index=False)
-                csv_buffer.seek(0)
+        return zip_buffer.getvalue()
 
-                # Write the CSV buffer to the ZIP file
-                csv_filename = f"{data_type.lower().replace(' ', '_')}.csv"
-                zip_file.writestr(csv_filename, csv_buffer.read())
 
-        # Reset the stream position of the zip buffer
-        zip_buffer.seek(0)
+class ParquetRenderer(ArrowZipRenderer):
+    format = "parquet"
+    extension = "parquet"
 
-        # Return the binary content of the ZIP file
-        return zip_buffer.read()
+    def write_table(self, table, sink):
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, sink, compression="zstd")
+
+
+class ArrowRenderer(ArrowZipRenderer):
+    format = "arrow"
+    extension = "arrow"
+
+    def write_table(self, table, sink):
+        # Arrow IPC file format, readable with pyarrow.ipc.open_file / Feather
+        import pyarrow as pa
+
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
 
 
 class PdfRenderer(BaseRenderer):
+    """
+    Draws each dataset as a paged table directly on the canvas.
+
+    Column widths are worked out once per dataset from the headers and every
+    row. Cells that don't fit their column are wrapped onto extra lines and
+    the row grows to hold them. Each line is a plain string drawn at a fixed
+    position instead of a platypus Paragraph, so the cost stays linear in
+    the number of cells and there is no table layout or splitting pass.
+    """
+
     media_type = "application/pdf"
     format = "pdf"
 
+    # Landscape A4, in points
+    page_size = (841.8897637795277, 595.2755905511812)
+    margin = 30
+    title_font = ("Helvetica-Bold", 18)
+    header_font = ("Helvetica-Bold", 10)
+    body_font = ("Helvetica", 8)
+    # Height of a single-line row, and of each extra line of a wrapped one
+    row_height = 14
+    header_line_height = 12
+    body_line_height = 10
+    cell_padding = 3
+
     def render(self, data, accepted_media_type=None, renderer_context=None):
         # Validate input data
         if not isinstance(data, dict) or "data" not in data or not data.get("data"):
             return b""  # Return empty byte string if data is invalid
 
-        # Extract 'people' data from the input JSON data
+        from reportlab.pdfgen import canvas
 
-        # Create an in-memory output stream for the PDF
         output = BytesIO()
+        pdf = canvas.Canvas(output, pagesize=self.page_size, pageCompression=1)
+        pdf.setTitle("Data Report")
 
-        # Setup PDF document
-        document = SimpleDocTemplate(
-            output,
-            pagesize=A4,
-            rightMargin=30,
-            leftMargin=30,
-            topMargin=30,
-            bottomMargin=18,
-            title="Data Report",
-        )
-        document.pagesize = landscape(A4)
-
-        styles = getSampleStyleSheet()
-        title_style = styles["Title"]
-        normal_style = styles["BodyText"]
-        styles.wordWrap = "CJK"
-
-        # page_width, _ = A4
-        # table_margin = 72  # 1 inch margin (in points)
-
-        # Create PDF elements
-        elements = [Spacer(1, 0.25 * inch)]
         for key, val in data["data"].items():
             if not isinstance(val, list) or not val:
                 continue
+            self.draw_table(pdf, f"{key.title()} Data", val)
 
-            # Prepare data for the table with headers
-            elements.append(Paragraph(f"{key.title()} Data", title_style))
-            elements.append(Spacer(1, 0.15 * inch))
+        pdf.save()
+        return output.getvalue()
 
-            # Extract headers dynamically based on the first item's keys
-            headers = (
-                [header.title().replace("_", " ") for header in val[0].keys()]
-                if val
-                else []
-            )
-            table_data = [headers]
+    def column_widths(self, natural_widths):
+        """
+        Fit the columns' natural widths to the page. Columns narrower than an
+        even share of the space keep their width and the others split what is
+        left in proportion, so only the widest columns wrap.
+        """
+        available = self.page_size[0] - 2 * self.margin
+        total = sum(natural_widths)
+        if total <= available:
+            return [width * available / total for width in natural_widths]
+
+        widths = list(natural_widths)
+        wide = set(range(len(widths)))
+        remaining = available
+        while wide:
+            even_share = remaining / len(wide)
+            narrow = {index for index in wide if widths[index] <= even_share}
+            if not narrow:
+                break
+            wide -= narrow
+            remaining -= sum(widths[index] for index in narrow)
+        wide_total = sum(widths[index] for index in wide)
+        for index in wide:
+            widths[index] = natural_widths[index] * remaining / wide_total
+        return widths
+
+    @staticmethod
+    def wrap(text, text_width, width, font_name, font_size):
+        """
+        Split `text` (`text_width` points wide) into lines no wider than
+        `width`, breaking inside a word only when it doesn't fit on a line
+        of its own.
+        """
+        if text_width <= width:
+            return [text]
+
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+
+        lines = []
+        line = ""
+        for word in text.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if stringWidth(candidate, font_name, font_size) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            while len(word) > 1 and stringWidth(word, font_name, font_size) > width:
+                cut = len(word) - 1
+                while cut > 1 and stringWidth(word[:cut], font_name, font_size) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+        return lines
+
+    def draw_table(self, pdf, title, rows):
+        from reportlab.lib import colors
+        from reportlab.lib.rl_accel import escapePDF
+        from reportlab.lib.units import inch
+        from reportlab.pdfbase.pdfmetrics import getFont, stringWidth
+
+        page_width, page_height = self.page_size
+        body_font_name, body_font_size = self.body_font
+        columns = list(rows[0].keys())
+        headers = [column.title().replace("_", " ") for column in columns]
+
+        # Every cell is measured once, to size the columns and to skip
+        # wrapping the ones that fit. Many values repeat (genders,
+        # countries, conditions), so widths are memoized.
+        cells = [[str(row.get(column, "")) for column in columns] for row in rows]
+        body_string_width = getFont(body_font_name).stringWidth
+        known_widths = {}
+
+        def measure(cell):
+            width = known_widths.get(cell)
+            if width is None:
+                width = known_widths[cell] = body_string_width(cell, body_font_size)
+            return width
+
+        cell_widths = [[measure(cell) for cell in row] for row in cells]
+        header_widths = [stringWidth(header, *self.header_font) for header in headers]
+        natural_widths = [
+            max(header_width, *(row[index] for row in cell_widths))
+            + 2 * self.cell_padding
+            for index, header_width in enumerate(header_widths)
+        ]
+        widths = self.column_widths(natural_widths)
+        table_width = sum(widths)
+        left = self.margin
+        x_positions = [left]
+        for width in widths:
+            x_positions.append(x_positions[-1] + width)
+        text_x = [x + self.cell_padding for x in x_positions]
+        text_widths = [width - 2 * self.cell_padding for width in widths]
+        # Distance from the top of a row to the baseline of its first line
+        first_baseline = self.row_height - ((self.row_height - body_font_size) / 2 + 1)
+
+        header_lines = [
+            self.wrap(header, header_width, width, *self.header_font)
+            for header, header_width, width in zip(headers, header_widths, text_widths)
+        ]
+        header_height = self.row_height + self.header_line_height * (
+            max(len(lines) for lines in header_lines) - 1
+        )
 
-            for item in val:
-                row = [
-                    Paragraph(
-                        str(item.get(header.lower().replace(" ", "_"), "")),
-                        normal_style,
+        row_index = 0
+        first_page = True
+        while row_index < len(rows) or first_page:
+            top = page_height - self.margin
+            if first_page:
+                pdf.setFont(*self.title_font)
+                pdf.drawCentredString(page_width / 2, top - 18, title)
+                top -= 18 + 0.25 * inch
+                first_page = False
+
+            # Lay out as many rows as fit, each as tall as its longest cell
+            body_top = top - header_height
+            bottom = body_top
+            page_rows = []
+            while row_index < len(rows):
+                lines = [
+                    (
+                        [cell]
+                        if cell_width <= width
+                        else self.wrap(cell, cell_width, width, *self.body_font)
+                    )
+                    for cell, cell_width, width in zip(
+                        cells[row_index], cell_widths[row_index], text_widths
                     )
-                    for header in headers
                 ]
-                table_data.append(row)
-
-            table = Table(table_data)
-            table.setStyle(
-                TableStyle(
-                    [
-                        ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                        ("FONTSIZE", (0, 0), (-1, 0), 12),
-                        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                        ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
-                        ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                    ]
+                height = self.row_height + self.body_line_height * (
+                    max(len(cell_lines) for cell_lines in lines) - 1
                 )
+                if page_rows and bottom - height < self.margin:
+                    break
+                page_rows.append((bottom, lines))
+                bottom -= height
+                row_index += 1
+
+            # Backgrounds: grey header, beige body
+            pdf.setFillColor(colors.grey)
+            pdf.rect(left, body_top, table_width, header_height, 0, 1)
+            pdf.setFillColor(colors.beige)
+            pdf.rect(left, bottom, table_width, body_top - bottom, 0, 1)
+
+            # Grid
+            pdf.setStrokeColor(colors.black)
+            pdf.setLineWidth(0.5)
+            row_lines = [top, body_top] + [row_top for row_top, _ in page_rows[1:]]
+            if page_rows:
+                row_lines.append(bottom)
+            pdf.lines(
+                [(left, y, left + table_width, y) for y in row_lines]
+                + [(x, top, x, bottom) for x in x_positions]
             )
 
-            # Add table to elements
-            elements.append(table)
-            elements.append(Spacer(1, 0.25 * inch))
-            elements.append(PageBreak())
+            # Header row
+            pdf.setFillColor(colors.whitesmoke)
+            pdf.setFont(*self.header_font)
+            for lines, x, width in zip(header_lines, x_positions, widths):
+                for line_index, line in enumerate(lines):
+                    pdf.drawCentredString(
+                        x + width / 2,
+                        top - first_baseline - line_index * self.header_line_height,
+                        line,
+                    )
+
+            # Body rows. Every line's position is already known, so the text
+            # operators are written out directly as one block per page rather
+            # than through a TextObject, which measures each string again to
+            # advance its cursor. The font set here stays selected inside it.
+            pdf.setFillColor(colors.black)
+            pdf.setFont(body_font_name, body_font_size)
+            operators = ["BT"]
+            for row_top, lines in page_rows:
+                for cell_lines, x in zip(lines, text_x):
+                    y = row_top - first_baseline
+                    for line in cell_lines:
+                        operators.append(
+                            f"1 0 0 1 {x:.2f} {y:.2f} Tm "
+                            f"({escapePDF(line.encode('cp1252', 'replace'))}) Tj"
+                        )
+                        y -= self.body_line_height
+            operators.append("ET")
+            pdf.addLiteral("\n".join(operators))
+            pdf.showPage()
+
+
+class NdjsonRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
 
-        # Build PDF in the output stream
-        document.build(elements)
-        output.seek(0)  # Reset the stream's position to the beginnin
-        return output.getvalue()
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Anything that isn't a dataset (e.g. an error body) becomes one line
+        if not isinstance(data, dict) or "data" not in data:
+            return encode_json(data) + b"\n"
+
+        return b"".join(
+            line
+            for data_type, data_list in data["data"].items()
+            for line in ndjson_lines(data_type, data_list)
+        )
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+
+class SharedStore:
+    """
+    Host-wide state for throttles and usage counters.
+
+    Every worker process on the host opens the same SQLite database in WAL
+    mode, so limits hold across workers and survive restarts without an
+    external service. Each operation is a single statement run in autocommit
+    mode, which SQLite executes atomically; WAL with synchronous=NORMAL keeps
+    commits off the disk's fsync path, so an operation costs tens of
+    microseconds.
+    """
+
+    # Expired throttle entries are swept after this many writes per process
+    purge_interval = 1000
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._writes = 0
+
+    def connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "key TEXT PRIMARY KEY, value REAL NOT NULL, expires REAL)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def gcra(self, key, increment, limit, now):
+        """
+        Advance the GCRA arrival time stored under `key` by `increment`,
+        unless that would put it more than `limit` seconds ahead of `now`.
+
+        Returns `(allowed, arrival)`, where `arrival` is the new arrival time
+        when allowed and the current one otherwise.
+        """
+        connection = self.connection()
+        row = connection.execute(
+            "INSERT INTO state (key, value, expires) VALUES (:key, :arrival, :arrival) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = max(value, :now) + :increment, "
+            "expires = max(value, :now) + :increment "
+            "WHERE max(value, :now) + :increment - :limit <= :now "
+            "RETURNING value",
+            {
+                "key": key,
+                "now": now,
+                "increment": increment,
+                "limit": limit,
+                "arrival": now + increment,
+            },
+        ).fetchone()
+        self.wrote(now)
+        if row is not None:
+            return True, row[0]
+
+        row = connection.execute(
+            "SELECT value FROM state WHERE key = ?", (key,)
+        ).fetchone()
+        return False, max(row[0], now) if row else now
+
+    def incr(self, key, amount=1):
+        """Atomically add `amount` to the counter under `key`; returns the total."""
+        row = (
+            self.connection()
+            .execute(
+                "INSERT INTO state (key, value) VALUES (:key, :amount) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + :amount "
+                "RETURNING value",
+                {"key": key, "amount": amount},
+            )
+            .fetchone()
+        )
+        return row[0]
+
+    def incr_many(self, amounts):
+        """Add every `{key: amount}` in one transaction."""
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO state (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+                amounts.items(),
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def items(self, prefix):
+        """All `(key, value)` pairs whose key starts with `prefix`, by key."""
+        # A range scan on the primary key, unlike LIKE
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return (
+            self.connection()
+            .execute(
+                "SELECT key, value FROM state WHERE key >= ? AND key < ? ORDER BY key",
+                (prefix, upper),
+            )
+            .fetchall()
+        )
+
+    def set(self, key, value):
+        self.connection().execute(
+            "INSERT INTO state (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def get(self, key, default=None):
+        row = (
+            self.connection()
+            .execute("SELECT value FROM state WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return default if row is None else row[0]
+
+    def wrote(self, now):
+        self._writes += 1
+        if self._writes % self.purge_interval == 0:
+            self.connection().execute("DELETE FROM state WHERE expires < ?", (now,))
+
+
+shared_store = SharedStore(settings.SHARED_STORE_PATH)
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def encode_json(value):
+    # Same encoder settings as DRF's JSONRenderer so streamed and buffered
+    # responses are formatted identically.
+    return json.dumps(
+        value,
+        cls=JSONEncoder,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        separators=(",", ":") if api_settings.COMPACT_JSON else (", ", ": "),
+    ).encode("utf-8")
+
+
+def stream_json(data_types, shards):
+    """
+    Yield the `{"data": {<type>: [...]}}` document piece by piece.
+
+    `shards` yields `(data_type, rows)` chunks grouped by type in the order of
+    `data_types`, so only a single chunk is ever held in memory.
+    """
+    shards = iter(shards)
+    pending = next(shards, None)
+
+    yield b'{"data":{'
+    for index, data_type in enumerate(data_types):
+        if index:
+            yield b","
+        yield encode_json(data_type) + b":["
+        first = True
+        while pending is not None and pending[0] == data_type:
+            # Encode the chunk as a list and strip the surrounding brackets
+            body = encode_json(pending[1])[1:-1]
+            yield body if first else b"," + body
+            first = False
+            pending = next(shards, None)
+        yield b"]"
+    yield b"}}"
+
+
+def ndjson_lines(data_type, rows):
+    # One self-describing record per line: {"type": ..., "data": {...}}
+    prefix = b'{"type":' + encode_json(data_type) + b',"data":'
+    for row in rows:
+        yield prefix + encode_json(row) + b"}\n"
+
+
+def stream_ndjson(shards):
+    """
+    Yield newline-delimited JSON records straight from the generation loop,
+    one `(data_type, rows)` chunk at a time.
+    """
+    for data_type, rows in shards:
+        yield b"".join(ndjson_lines(data_type, rows))
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that hands out what was written so far."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_csv_zip(shards):
+    """
+    Yield a deflate-compressed zip with one `<type>.csv` per data type,
+    written row by row from `(data_type, rows)` chunks grouped by type.
+
+    The zip is written to a non-seekable sink, so entries use data
+    descriptors and every chunk can be sent as soon as it is compressed.
+    """
+    sink = ChunkSink()
+    with ZipFile(sink, "w", compression=ZIP_DEFLATED) as zip_file:
+        current_type = None
+        csv_file = None
+        for data_type, rows in shards:
+            if not rows:
+                continue
+            if data_type != current_type:
+                if csv_file:
+                    csv_file.close()
+                current_type = data_type
+                entry = zip_file.open(f"{data_type.lower().replace(' ', '_')}.csv", "w")
+                csv_file = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+                writer = csv.writer(csv_file, lineterminator="\n")
+                # Title case the column names
+                writer.writerow([column.title() for column in rows[0]])
+
+            writer.writerows(row.values() for row in rows)
+            csv_file.flush()
+            yield sink.drain()
+
+        if csv_file:
+            csv_file.close()
+    yield sink.drain()
@@ -1,9 +1,89 @@
+import math
+
 from rest_framework import status
 from rest_framework.exceptions import Throttled
 from rest_framework.throttling import SimpleRateThrottle
 
+from commons.shared_store import shared_store
+from helpers.schemas import SCHEMAS
+
+
+class GCRAThrottle(SimpleRateThrottle):
+    """
+    Rate throttle using the generic cell rate algorithm.
+
+    Instead of the list of request timestamps kept by SimpleRateThrottle,
+    the only state per client is its "theoretical arrival time": the moment
+    its allowance would be fully used up if requests kept arriving at the
+    allowed rate. Each request pushes it forward by one emission interval
+    (duration / num_requests), and a request is rejected when that would put
+    it more than `duration` ahead of now. This allows bursts of up to
+    `num_requests` and costs the same whatever the rate is.
+
+    Requests weigh one unit each unless `get_cost` says otherwise. State
+    lives in commons.shared_store, so the limit is shared by every worker
+    process on the host rather than applied per process.
+    """
+
+    header_prefix = "X-RateLimit"
+
+    # Seconds of float error tolerated when comparing arrival times, which
+    # otherwise builds up over a burst and rejects the last allowed request
+    tolerance = 1e-3
+
+    remaining = None
+    retry_after = None
+    reset_after = None
+
+    def get_cost(self, request, view):
+        return 1
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        interval = self.duration / self.num_requests
+        # A single request never costs more than the whole allowance, or it
+        # could never be let through
+        increment = min(self.get_cost(request, view), self.num_requests) * interval
+        # Less than half an interval, so it never amounts to a whole request
+        limit = self.duration + min(self.tolerance, interval / 2)
+        allowed, arrival = shared_store.gcra(self.key, increment, limit, self.now)
+
+        if not allowed:
+            self.remaining = 0
+            self.retry_after = arrival + increment - limit - self.now
+            return self.throttle_failure()
+
+        self.remaining = int((limit - (arrival - self.now)) / interval)
+        self.reset_after = arrival - self.now
+        return self.throttle_success()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+    def get_headers(self):
+        """X-RateLimit-* headers describing the client's remaining allowance."""
+        if self.remaining is None:
+            return {}
+        return {
+            f"{self.header_prefix}-Limit": str(self.num_requests),
+            f"{self.header_prefix}-Remaining": str(self.remaining),
+            f"{self.header_prefix}-Reset": str(
+                math.ceil(self.retry_after or self.reset_after)
+            ),
+        }
+
 
-class AnonUserRateThrottle(SimpleRateThrottle):
+class AnonUserRateThrottle(GCRAThrottle):
     scope = "anon"
     rate = "50/min"  # Ensure this is correctly set.
     max_data_range = 50
@@ -21,16 +101,19 @@ class AnonUserRateThrottle(SimpleRateThrottle):
         """
         Custom response when the request is throttled.
         """
-        raise Throttled(
+        exception = Throttled(
             detail={
                 "detail": "Request limit exceeded. Please try again later.",
                 "status_code": status.HTTP_429_TOO_MANY_REQUESTS,
-                "retry_after": self.wait(),  # Optionally include retry time in seconds
+                "retry_after": math.ceil(self.wait()),
             }
         )
+        # Picked up by DRF's exception handler for the Retry-After header
+        exception.wait = math.ceil(self.wait())
+        raise exception
 
 
-class FreeUserRateThrottle(SimpleRateThrottle):
+class FreeUserRateThrottle(GCRAThrottle):
     scope = "free"
     rate = "500/min"
     max_data_range = 1000
@@ -48,3 +131,61 @@ class PaidUserRateThrottle(FreeUserRateThrottle):
     scope = "paid"
     rate = "2000/min"
     max_data_range = 10000
+
+
+class RowBudgetThrottle:
+    """
+    Throttle mixin that budgets generated rows instead of requests.
+
+    Each /data/dummy/ request spends `range x number of types` units,
+    multiplied by its output format's weight, so what is limited is the
+    work done rather than the request count. Mixed into the tier throttles
+    below, whose `rate` is then the row budget per period. DummyData only
+    checks it once the request has passed its rate throttle and validation.
+    """
+
+    header_prefix = "X-RowLimit"
+
+    # Relative cost of producing a row in each format (JSON = 1)
+    format_weights = {
+        "json": 1,
+        "ndjson": 1,
+        "csv": 1,
+        "parquet": 1,
+        "arrow": 1,
+        "api": 2,
+        "pdf": 7,
+        "xlsx": 12,
+    }
+
+    def get_cost(self, request, view):
+        try:
+            data_range = int(request.query_params.get("range", 50))
+        except ValueError:
+            data_range = 50
+        data_range = max(0, min(self.max_data_range, data_range))
+
+        data_types = {
+            data_type.lower()
+            for data_type in request.query_params.getlist("type")
+            if data_type.lower() in SCHEMAS
+        }
+
+        renderer = getattr(request, "accepted_renderer", None)
+        weight = self.format_weights.get(getattr(renderer, "format", None), 1)
+        return data_range * len(data_types) * weight
+
+
+class AnonUserRowThrottle(RowBudgetThrottle, AnonUserRateThrottle):
+    scope = "anon_rows"
+    rate = "10000/min"
+
+
+class FreeUserRowThrottle(RowBudgetThrottle, FreeUserRateThrottle):
+    scope = "free_rows"
+    rate = "300000/min"
+
+
+class PaidUserRowThrottle(RowBudgetThrottle, PaidUserRateThrottle):
+    scope = "paid_rows"
+    rate = "3000000/min"
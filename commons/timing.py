@@ -0,0 +1,89 @@
+import time
+from contextlib import contextmanager
+
+from rest_framework.response import Response
+
+
+class PhaseTimer:
+    """
+    Durations of the named phases of one request.
+
+    Phases are exclusive: while a nested phase runs, the enclosing one is
+    paused, so the phases add up to the time they cover. RequestTimingMiddleware
+    creates one per request, reports it in the Server-Timing header and
+    records it in commons.metrics, tagged with `labels`. `details` holds
+    unbounded values (e.g. the range) that only go into logs.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.labels = {}
+        self.details = {}
+        self._stack = []
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.add(outer[0], now - outer[1])
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.add(name, now - self._stack.pop()[1])
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def timed_iter(self, name, iterable):
+        """Iterate `iterable`, counting the time spent producing items as `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def header(self):
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()
+        )
+
+
+def get_timer(request):
+    # DRF requests proxy attribute lookups to the wrapped HttpRequest
+    return getattr(request, "phase_timer", None)
+
+
+@contextmanager
+def phase(request, name):
+    """Time a block as phase `name` of the request, if it is being timed."""
+    timer = get_timer(request)
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+def timed_iter(request, name, iterable):
+    timer = get_timer(request)
+    if timer is None:
+        return iterable
+    return timer.timed_iter(name, iterable)
+
+
+class TimedResponse(Response):
+    """Response whose rendering is timed as the request's "render" phase."""
+
+    @property
+    def rendered_content(self):
+        request = (getattr(self, "renderer_context", None) or {}).get("request")
+        with phase(request, "render"):
+            return super().rendered_content
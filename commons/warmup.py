@@ -0,0 +1,34 @@
+import gc
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """
+    Load everything a /data/dummy/ request needs before workers are forked.
+
+    Called from fakedata.wsgi / fakedata.asgi when WARM_UP_ON_LOAD is set,
+    for use with a preloading server (e.g. `gunicorn --preload`): the
+    sampling pools, URLconf and renderer libraries are built once in the
+    master and shared with every worker copy-on-write, and no worker pays
+    for them on its first request.
+    """
+    start = time.perf_counter()
+
+    from django.urls import get_resolver
+
+    from commons import renderer
+    from helpers.data_generator import DataGenerator
+
+    get_resolver().url_patterns
+    DataGenerator.get_pools()
+    renderer.preload()
+
+    # Move everything allocated so far out of the collector's reach: a full
+    # collection in a worker would otherwise touch (and copy) every page.
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Warm-up took {time.perf_counter() - start:.4f} seconds.")
@@ -1,7 +1,99 @@
+from collections import Counter
+
 from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
 
-from .models import UserSavedData
+from .models import RequestProfile, UserSavedData
 
 # Register your models here.
 
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = [
+        "created_at",
+        "method",
+        "path",
+        "status_code",
+        "duration",
+        "sample_count",
+        "user",
+    ]
+    list_filter = ["method", "status_code"]
+    search_fields = ["path", "query_string"]
+    readonly_fields = [
+        "id",
+        "created_at",
+        "user",
+        "method",
+        "path",
+        "query_string",
+        "status_code",
+        "duration",
+        "sample_count",
+        "download",
+        "hottest_functions",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def delete_queryset(self, request, queryset):
+        # One by one, so each profile's file is removed too
+        for profile in queryset:
+            profile.delete()
+
+    def get_urls(self):
+        return [
+            path(
+                "<uuid:pk>/folded/",
+                self.admin_site.admin_view(self.folded_view),
+                name="data_requestprofile_folded",
+            )
+        ] + super().get_urls()
+
+    def folded_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if not profile.file_path.exists():
+            raise Http404
+        return FileResponse(
+            profile.file_path.open("rb"),
+            as_attachment=True,
+            filename=f"profile-{pk}.folded",
+            content_type="text/plain",
+        )
+
+    @admin.display(description="Folded stacks")
+    def download(self, obj):
+        url = reverse("admin:data_requestprofile_folded", args=[obj.pk])
+        return format_html(
+            '<a href="{}">Download</a> (open in speedscope or flamegraph.pl)', url
+        )
+
+    @admin.display(description="Hottest functions (self samples)")
+    def hottest_functions(self, obj):
+        if not obj.file_path.exists():
+            return "-"
+        # Samples per innermost frame, i.e. where the time was actually spent
+        counts = Counter()
+        for line in obj.file_path.read_text().splitlines():
+            stack, _, count = line.rpartition(" ")
+            counts[stack.rsplit(";", 1)[-1]] += int(count)
+        total = sum(counts.values()) or 1
+        return format_html(
+            "<table>{}</table>",
+            format_html_join(
+                "",
+                "<tr><td>{}</td><td>{}%</td></tr>",
+                (
+                    (frame, f"{count * 100 / total:.1f}")
+                    for frame, count in counts.most_common(20)
+                ),
+            ),
+        )
+
+
 admin.site.register(UserSavedData)
+admin.site.register(RequestProfile, RequestProfileAdmin)
@@ -0,0 +1,189 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from helpers.schemas import SCHEMAS
+
+# Runs in a fresh interpreter so every measurement is a real cold start. The
+# timings are printed as JSON on stdout, `-X importtime` writes to stderr.
+CHILD_SCRIPT = """
+import json
+import os
+import time
+
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", {settings_module!r})
+
+import django
+
+django.setup()
+setup_done = time.perf_counter()
+
+from django.urls import get_resolver
+
+# Import every URLconf and view, like the first request would
+get_resolver().url_patterns
+urls_done = time.perf_counter()
+
+if {warm_up!r}:
+    from commons.warmup import warm_up
+
+    warm_up()
+warm_up_done = time.perf_counter()
+
+from django.test import Client
+
+client_ready = time.perf_counter()
+response = Client().get("/data/dummy/", {query!r})
+if response.streaming:
+    b"".join(response.streaming_content)
+done = time.perf_counter()
+
+print(
+    json.dumps(
+        {{
+            "status": response.status_code,
+            "setup": setup_done - start,
+            "urls": urls_done - setup_done,
+            "warm_up": warm_up_done - urls_done,
+            "first_response": done - client_ready,
+            "total": (warm_up_done - start) + (done - client_ready),
+        }}
+    )
+)
+"""
+
+PHASES = ("setup", "urls", "warm_up", "first_response", "total")
+
+
+def parse_importtime(stderr):
+    """Sum the self time of every imported module by top-level package (ms)."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line[len("import time:") :].split("|")
+        package = module.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+    return packages
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start cost: time to django.setup(), to load the URLconf "
+        "and to serve the first /data/dummy/ response, plus import time by "
+        "package. Each run is a fresh interpreter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--format", default="json", help="Format of the first request."
+        )
+        parser.add_argument(
+            "--type",
+            action="append",
+            help="Data type of the first request (repeatable, default: all).",
+        )
+        parser.add_argument("--range", type=int, default=50)
+        parser.add_argument(
+            "--top", type=int, default=15, help="Packages listed in the breakdown."
+        )
+        parser.add_argument(
+            "--warm-up",
+            action="store_true",
+            help="Run commons.warmup before the first request, as the WSGI app does "
+            "with WARM_UP_ON_LOAD=1.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the results as JSON."
+        )
+        parser.add_argument(
+            "--max-total-ms",
+            type=float,
+            help=(
+                "Fail if the median total cold start (setup, URLconf, warm-up "
+                "and first response) is above this."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if not options["type"]:
+            options["type"] = sorted(SCHEMAS)
+        script = CHILD_SCRIPT.format(
+            settings_module=os.environ["DJANGO_SETTINGS_MODULE"],
+            warm_up=options["warm_up"],
+            query={
+                "type": options["type"],
+                "format": options["format"],
+                "range": options["range"],
+            },
+        )
+
+        runs = []
+        imports = []
+        for _ in range(options["runs"]):
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", script],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                raise CommandError(result.stderr.strip().splitlines()[-1])
+            run = json.loads(result.stdout.strip().splitlines()[-1])
+            if run["status"] != 200:
+                raise CommandError(f"First request failed with {run['status']}")
+            runs.append(run)
+            imports.append(parse_importtime(result.stderr))
+
+        timings = {
+            phase: {
+                "median_ms": statistics.median(run[phase] for run in runs) * 1000,
+                "min_ms": min(run[phase] for run in runs) * 1000,
+                "max_ms": max(run[phase] for run in runs) * 1000,
+            }
+            for phase in PHASES
+        }
+        packages = {
+            package: statistics.median(run.get(package, 0) for run in imports)
+            for package in set().union(*imports)
+        }
+        top_packages = sorted(packages.items(), key=lambda item: -item[1])[
+            : options["top"]
+        ]
+
+        if options["json"]:
+            self.stdout.write(
+                json.dumps(
+                    {
+                        "runs": len(runs),
+                        "timings": timings,
+                        "imports_ms": dict(top_packages),
+                    },
+                    indent=2,
+                )
+            )
+        else:
+            self.stdout.write(f"{len(runs)} cold starts")
+            self.stdout.write(f"{'phase':<16}{'median':>10}{'min':>10}{'max':>10}")
+            for phase, timing in timings.items():
+                self.stdout.write(
+                    f"{phase:<16}{timing['median_ms']:>8.1f}ms"
+                    f"{timing['min_ms']:>8.1f}ms{timing['max_ms']:>8.1f}ms"
+                )
+            self.stdout.write("\nImport time by package (median, self time summed)")
+            for package, elapsed in top_packages:
+                self.stdout.write(f"  {package:<30}{elapsed:>8.1f}ms")
+
+        limit = options["max_total_ms"]
+        if limit is not None and timings["total"]["median_ms"] > limit:
+            raise CommandError(
+                f"Median cold start {timings['total']['median_ms']:.1f}ms "
+                f"is above {limit:.1f}ms"
+            )
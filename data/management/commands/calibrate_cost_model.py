@@ -0,0 +1,142 @@
+import json
+import time
+import tracemalloc
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from commons.renderer import (
+    ArrowRenderer,
+    ExcelRenderer,
+    ParquetRenderer,
+    PdfRenderer,
+)
+from commons.streaming import stream_csv_zip, stream_ndjson
+from helpers.data_generator import DataGenerator
+from helpers.schemas import SCHEMAS
+from helpers.sharding import shard_executor
+
+
+def significant(value):
+    # Four significant digits is well beyond the accuracy of the measurements
+    return float(f"{value:.4g}")
+
+
+def render_workbook(grouped_data):
+    output = BytesIO()
+    ExcelRenderer.write_workbook(grouped_data.items(), output)
+    return output.getvalue()
+
+
+# How each format turns generated data into response bytes, as in DummyData
+RENDERERS = {
+    "json": lambda grouped_data: JSONRenderer().render({"data": grouped_data}),
+    "ndjson": lambda grouped_data: b"".join(stream_ndjson(grouped_data.items())),
+    "csv": lambda grouped_data: b"".join(stream_csv_zip(grouped_data.items())),
+    "xlsx": render_workbook,
+    "pdf": lambda grouped_data: PdfRenderer().render({"data": grouped_data}),
+    "parquet": lambda grouped_data: ParquetRenderer().render({"data": grouped_data}),
+    "arrow": lambda grouped_data: ArrowRenderer().render({"data": grouped_data}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark generation and rendering of every data type in every format "
+        "and write the per-row costs used by helpers.cost_model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs=2,
+            default=[1000, 5000],
+            help="The two row counts each cost is measured at.",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--output", default=str(settings.COST_MODEL_PATH))
+
+    def measure(self, data_type, data_format, rows, repeat):
+        """Best-of-`repeat` seconds and the response size for `rows` rows."""
+        generator = DataGenerator()
+        generator.seed(0)
+        jobs = [(data_type, SCHEMAS[data_type], None)]
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            grouped_data = shard_executor.generate(generator, jobs, rows)
+            content = RENDERERS[data_format](grouped_data)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(content)
+
+    def handle(self, *args, **options):
+        small, large = options["rows"]
+        repeat = options["repeat"]
+        DataGenerator.get_pools()
+
+        formats = {}
+        for data_format in RENDERERS:
+            model = {"bytes_per_row": {}, "seconds_per_row": {}}
+            bytes_overheads, seconds_overheads = [], []
+            for data_type in SCHEMAS:
+                small_seconds, small_bytes = self.measure(
+                    data_type, data_format, small, repeat
+                )
+                large_seconds, large_bytes = self.measure(
+                    data_type, data_format, large, repeat
+                )
+                # Slope and intercept of the line through both measurements
+                seconds_per_row = (large_seconds - small_seconds) / (large - small)
+                bytes_per_row = (large_bytes - small_bytes) / (large - small)
+                model["seconds_per_row"][data_type] = significant(seconds_per_row)
+                model["bytes_per_row"][data_type] = significant(bytes_per_row)
+                seconds_overheads.append(small_seconds - seconds_per_row * small)
+                bytes_overheads.append(small_bytes - bytes_per_row * small)
+
+            model["seconds_overhead"] = significant(
+                max(0, sum(seconds_overheads) / len(seconds_overheads))
+            )
+            model["bytes_overhead"] = max(
+                0, int(sum(bytes_overheads) / len(bytes_overheads))
+            )
+            formats[data_format] = model
+            self.stdout.write(
+                f"{data_format:<8}"
+                + "  ".join(
+                    f"{data_type} {model['seconds_per_row'][data_type] * 1e6:.1f}us/"
+                    f"{model['bytes_per_row'][data_type]:.0f}B"
+                    for data_type in SCHEMAS
+                )
+            )
+
+        # Memory held by materialized rows, per row
+        memory_per_row = {}
+        generator = DataGenerator()
+        for data_type, schema in SCHEMAS.items():
+            tracemalloc.start()
+            grouped_data = shard_executor.generate(
+                generator, [(data_type, schema, None)], large
+            )
+            memory_per_row[data_type] = significant(
+                tracemalloc.get_traced_memory()[0] / large
+            )
+            tracemalloc.stop()
+            del grouped_data
+
+        with open(options["output"], "w") as model_file:
+            json.dump(
+                {
+                    "rows": [small, large],
+                    "formats": formats,
+                    "memory_per_row": memory_per_row,
+                },
+                model_file,
+                indent=2,
+                sort_keys=True,
+            )
+            model_file.write("\n")
+        self.stdout.write(f"Wrote {options['output']}")
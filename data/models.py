@@ -1,6 +1,10 @@
+from pathlib import Path
+
 from django.conf import settings
 from django.db import models
 
+from commons.models import TimeStampedModel
+
 # Create your models here.
 
 
@@ -15,3 +19,34 @@ class UserSavedData(models.Model):
 
     class Meta:
         verbose_name_plural = "User Data"
+
+
+class RequestProfile(TimeStampedModel):
+    """
+    A sampled profile of one request, recorded by SamplingProfilerMiddleware.
+    The stacks themselves are stored in PROFILE_DIR in the folded format.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    query_string = models.TextField(blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration = models.FloatField(help_text="Seconds")
+    sample_count = models.PositiveIntegerField()
+
+    def __str__(self) -> str:
+        return f"{self.method} {self.path} ({self.duration:.3f}s)"
+
+    @property
+    def file_path(self):
+        return Path(settings.PROFILE_DIR) / f"{self.pk}.folded"
+
+    def delete(self, *args, **kwargs):
+        self.file_path.unlink(missing_ok=True)
+        return super().delete(*args, **kwargs)
+
+    class Meta:
+        ordering = ["-created_at"]
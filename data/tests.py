@@ -1,3 +1,194 @@
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from commons.artifact_cache import ArtifactCache
+from commons.authentication import UserCache
+from commons.shared_store import SharedStore
+from commons.streaming import ndjson_lines
+from commons.throttles import GCRAThrottle
+from users.models import User
+
+URL = "/data/dummy/"
+
+
+class DummyDataTestCase(TestCase):
+    def setUp(self):
+        # A private shared store and artifact cache, so state starts empty
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = SharedStore(Path(directory.name) / "shared.sqlite3")
+        self.artifact_cache = ArtifactCache(
+            Path(directory.name) / "artifacts", 512 * 1024 * 1024
+        )
+        for patcher in (
+            mock.patch("data.views.artifact_cache", self.artifact_cache),
+            mock.patch("commons.artifact_cache.shared_store", store),
+            mock.patch("commons.authentication.shared_store", store),
+            mock.patch("commons.metrics.shared_store", store),
+            mock.patch("commons.throttles.shared_store", store),
+            mock.patch("commons.authentication.user_cache", UserCache(300, 100)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+
+
+class GCRAThrottleTests(DummyDataTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        patcher = mock.patch.object(GCRAThrottle, "timer", lambda throttle: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_allows_exactly_the_rate_then_sets_retry_after(self):
+        # Anonymous clients get 50 requests a minute; dry runs spend no rows
+        query = {"type": "person", "dry_run": "true"}
+        for index in range(50):
+            response = self.client.get(URL, query)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["X-RateLimit-Remaining"], str(49 - index))
+
+        response = self.client.get(URL, query)
+        self.assertEqual(response.status_code, 429)
+        # One request frees up every 60 / 50 = 1.2s
+        self.assertEqual(response["Retry-After"], "2")
+
+        self.now += 1.25
+        self.assertEqual(self.client.get(URL, query).status_code, 200)
+
+    def test_row_budget_weighs_rows_by_format(self):
+        # 3 types x 50 rows x 12 (xlsx) = 1800 of the 10000 anonymous rows
+        query = {"type": ["person", "product", "weather"], "format": "xlsx"}
+        for index in range(5):
+            response = self.client.get(URL, query)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["X-RowLimit-Remaining"], str(8200 - 1800 * index))
+
+        response = self.client.get(URL, query)
+        self.assertEqual(response.status_code, 429)
+        # 1800 rows take 10.8s to free up, and the 1000 left already cover 6s
+        self.assertEqual(response["Retry-After"], "5")
+
+    def test_only_accepted_requests_spend_rows(self):
+        user = User.objects.create_user(
+            "alice", "password", slug="alice", email="alice@example.com"
+        )
+        self.client.force_authenticate(user)
+        query = {"type": "person", "range": 1000}
+        response = self.client.get(URL, query)
+        self.assertEqual(response["X-RowLimit-Remaining"], "299000")
+
+        # Neither an invalid request nor ones over the 500 requests a minute
+        # of the free tier are charged for rows they never generate
+        self.assertEqual(self.client.get(URL, {**query, "offset": -1}).status_code, 400)
+        for _ in range(498):
+            self.client.get(URL, {**query, "dry_run": "true"})
+        self.assertEqual(self.client.get(URL, query).status_code, 429)
+
+        # One request frees up every 0.12s, while 625 rows come back
+        self.now += 0.125
+        response = self.client.get(URL, query)
+        self.assertEqual(response["X-RowLimit-Remaining"], "298625")
+
+
+class SeededDatasetTests(DummyDataTestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user(
+            "alice", "password", slug="alice", email="alice@example.com"
+        )
+        self.client.force_authenticate(user)
+
+    def get_lines(self, **params):
+        """The NDJSON records of a seeded request, grouped by type."""
+        query = {"type": ["person", "weather"], "seed": "42", "format": "ndjson"}
+        response = self.client.get(URL, {**query, **params})
+        self.assertEqual(response.status_code, 200)
+        lines = {"person": [], "weather": []}
+        for line in response.getvalue().splitlines():
+            lines[json.loads(line)["type"]].append(line)
+        return lines
+
+    def test_offset_window_is_a_slice_of_the_dataset(self):
+        full = self.get_lines(range=1000, offset=500)
+        # Rows 990 to 1009, across the boundary between two shards
+        window = self.get_lines(range=20, offset=990)
+        for data_type, lines in window.items():
+            self.assertEqual(len(lines), 20)
+            self.assertEqual(lines, full[data_type][490:510])
+
+    def test_only_seeded_requests_link_to_the_next_page(self):
+        response = self.client.get(URL, {"type": "person", "range": 3, "seed": "42"})
+        self.assertIn("offset=3", response["Link"])
+        # Unseeded requests get a random seed, so there is no next page
+        response = self.client.get(URL, {"type": "person", "range": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Link", response)
+
+    def test_projection_is_a_slice_of_each_row(self):
+        full = self.get_lines(range=100)
+        projected = self.get_lines(range=100, fields="email,name,city")
+        kept = {"person": ("name", "email"), "weather": ("city",)}
+        for data_type, lines in full.items():
+            rows = [json.loads(line)["data"] for line in lines]
+            expected = ndjson_lines(
+                data_type,
+                [{field: row[field] for field in kept[data_type]} for row in rows],
+            )
+            self.assertEqual(
+                projected[data_type], [line.rstrip(b"\n") for line in expected]
+            )
+
+
+class ArtifactCacheTests(DummyDataTestCase):
+    def setUp(self):
+        super().setUp()
+        self.paid_user = User.objects.create_user(
+            "alice",
+            "password",
+            slug="alice",
+            email="alice@example.com",
+            is_paiduser=True,
+        )
+        self.free_user = User.objects.create_user(
+            "bob", "password", slug="bob", email="bob@example.com"
+        )
+
+    def get(self, user, seed):
+        self.client.force_authenticate(user)
+        response = self.client.get(URL, {"type": "person", "seed": seed})
+        self.assertEqual(response.status_code, 200)
+        return response["X-Cache"], response.getvalue()
+
+    def test_repeat_request_is_served_from_cache(self):
+        cache_status, content = self.get(self.paid_user, "abc")
+        self.assertEqual(cache_status, "MISS")
+        self.assertEqual(self.get(self.paid_user, "abc"), ("HIT", content))
+
+    def test_free_seed_does_not_collide_with_derived_paid_seed(self):
+        _, paid_content = self.get(self.paid_user, "abc")
+        # The seed paid requests derive from the parameter and the user id
+        paid_seed = int(
+            hashlib.md5(f"abc_{self.paid_user.id}".encode("utf-8")).hexdigest(), 16
+        ) % (10**8)
+
+        cache_status, free_content = self.get(self.free_user, str(paid_seed))
+        self.assertEqual(cache_status, "MISS")
+        self.assertNotEqual(free_content, paid_content)
 
-# Create your tests here.
+    def test_lock_files_do_not_outlive_their_lock(self):
+        key = self.artifact_cache.make_key("rendered")
+        with self.artifact_cache.lock(key, timeout=1):
+            self.artifact_cache.put(key, b"content")
+        with self.assertRaises(RuntimeError):
+            with self.artifact_cache.lock(self.artifact_cache.make_key("failed"), 1):
+                raise RuntimeError
+        self.assertEqual(list(self.artifact_cache.directory.glob("*/.lock-*")), [])
@@ -1,7 +1,11 @@
 import hashlib
 import json
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
 
-import faker_commerce
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
 from drf_spectacular.utils import (
     OpenApiExample,
     OpenApiParameter,
@@ -11,23 +15,48 @@ from drf_spectacular.utils import (
 )
 
 # from drf_spectacular.types import
-from faker import Faker
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from commons.renderer import CsvRenderer, ExcelRenderer, PdfRenderer
+from commons.artifact_cache import artifact_cache
+from commons.authentication import CachedJWTAuthentication
+from commons.renderer import (
+    ArrowRenderer,
+    CsvRenderer,
+    ExcelRenderer,
+    NdjsonRenderer,
+    ParquetRenderer,
+    PdfRenderer,
+)
+from commons.streaming import stream_csv_zip, stream_json, stream_ndjson
 from commons.throttles import (
     AnonUserRateThrottle,
+    AnonUserRowThrottle,
     FreeUserRateThrottle,
+    FreeUserRowThrottle,
     PaidUserRateThrottle,
+    PaidUserRowThrottle,
 )
+from commons.timing import TimedResponse, get_timer, phase, timed_iter
+from helpers.cost_model import cost_model
 from helpers.data_generator import DataGenerator
+from helpers.schemas import GENERATOR_VERSION, SCHEMAS
+from helpers.sharding import shard_executor
 from helpers.unique_id import device_id
 
+# Renderers whose output depends only on the generated data
+CACHEABLE_RENDERERS = (
+    JSONRenderer,
+    ExcelRenderer,
+    PdfRenderer,
+    CsvRenderer,
+    ParquetRenderer,
+    ArrowRenderer,
+)
+
 
 @extend_schema(
     description="""
@@ -36,29 +65,29 @@ This API endpoint provides a flexible way to generate randomized mock data based
 \nThe endpoint supports customizable data generation limits (via the optional **Range** parameter) and various response formats parameter including **JSON**, **CSV**, **PDF**, and **xlsx**, depending on the client's requested content type. Additionally, an optional **Seed** parameter allows for consistent, repeatable data generation, ensuring that requests with the same seed produce identical outputs.
 \nAccess control and data limits are determined by user authentication status. Unauthenticated users are throttled with limited data access while authenticated users receive increased limits with optional seed values for consistency across requests, and paid users get the highest data range.
 
+Each tier also has a per-minute row budget: a request spends `range` × number of types, weighted by format (PDF and xlsx cost more per row than JSON, CSV, NDJSON, Parquet or Arrow). Only requests that pass the request limit and validation, and are not dry runs, spend rows. Remaining allowances are reported in the `X-RateLimit-*` (requests) and `X-RowLimit-*` (rows) response headers, and throttled responses carry `Retry-After`.
+
 # Data Generation Logic
-This API leverages the `Faker` library to generate realistic data for multiple domains, including personal profiles, e-commerce products, and weather conditions. The data generation is controlled by the `DummyData` view class, which dynamically maps query parameters to specific methods in the `DataGenerator` class. These methods handle the creation of structured and diverse datasets.
+This API leverages the `Faker` library to generate realistic data for multiple domains, including personal profiles, e-commerce products, and weather conditions. The data generation is controlled by the `DummyData` view class, which maps query parameters to declarative data-type schemas registered in `helpers.schemas`. Each schema is compiled once at startup into a fast batch function that handles the creation of structured and diverse datasets.
 
-The `DummyData` class contains a dictionary, `faker_methods`, which maps query parameter values (e.g.`person`, `product`, `weather`) to their respective data generation methods in `DataGenerator`. This mapping ensures that the correct method is called based on the client's request.
+The `SCHEMAS` registry maps query parameter values (e.g.`person`, `product`, `weather`) to their schemas. This table is built once when the module is loaded, so the correct generator is looked up directly for each request.
 
-For example, if the query parameter `type=person` is provided, the API will invoke the `generate_person_data` method to produce records with fields like name, age, gender, and email.
+For example, if the query parameter `type=person` is provided, the API will invoke the compiled `person` schema to produce a batch of records with fields like name, age, gender, and email.
 
 # Custom Providers
 The API extends the functionality of the `Faker` library by incorporating a custom provider from the `faker_commerce` module. This provider enhances the library's capabilities, enabling the generation of e-commerce-related data such as product names, categories, and SKU identifiers.
 
-# Key Features of the DataGenerator Class
-The `DataGenerator` class contains reusable methods for generating specific types of data:
-
-1. Personal Data: The `generate_person_data` method creates detailed profiles, including name, age, gender, nationality, phone number, address, and email. The email addresses are consistently generated using a predefined Gmail domain for simplicity.
+# Schemas and Value Pools
+Faker is only used once per process, to fill the `DataGenerator` value pools: a fixed set of first and last names, countries, calling codes, streets, cities, product names and categories. A schema describes each field of its type in terms of those pools, and its compiled batch function builds whole columns at once by sampling them with numpy:
 
-2. Weather Data: The `generate_weather_data` method simulates weather conditions, including temperature, humidity, wind speed, and general weather conditions (e.g., "Sunny", "Rainy"). It also includes location details such as city and country.
+1. Person (`person`): name (first + last name), age (18–80), gender, nationality, phone number (calling code + ten digits), address (street + city line) and a Gmail address built from pooled names.
 
-3. Product Data: The `generate_product_data` method generates e-commerce data, including product names, categories, prices (formatted as currency), stock levels, and unique SKUs.
+2. Weather (`weather`): temperature (°C), humidity (%), wind speed (km/h), condition ("Sunny", "Rainy", "Cloudy" or "Snowy"), city and country.
 
-4. Phone Number Generation: A utility method, `generate_phone_num`, creates realistic phone numbers by combining country calling codes with randomly generated digits.
+3. Product (`product`): name, category, price (formatted as currency), stock level and an EAN-13 SKU.
 
 # Data Seeding for Reproducibility
-To ensure consistent results across requests, the API uses a seeding mechanism with the `Faker` library. This mechanism ensures that the same input produces identical output, allowing users to generate reproducible datasets.
+To ensure consistent results across requests, every request seeds its own numpy random streams (one per column) from the request's seed. This mechanism ensures that the same input produces identical output, allowing users to generate reproducible datasets.
 
 For authenticated users, especially paid users, the `seed` is a combination of the user's unique ID and an optional seed parameter provided in the request. This combined seed value is hashed to create a deterministic, user-specific seed. The reason for combining and hashing the seed is to ensure that if two different authenticated users pass the same seed parameter, the generated data will remain consistent for each individual user but differ between users. This design ensures both reproducibility and uniqueness across users.
 
@@ -69,6 +98,7 @@ The API includes robust input validation to ensure correct usage:
 
 - If the `type` query parameter is missing, an error is returned indicating that the parameter is required.
 - If an unsupported `type` is provided, an error message informs the client about the invalid data type.
+- If `fields` names a field that none of the requested types have, or selects no field at all for one of the types, an error is returned.
 This validation ensures that clients receive clear feedback about their requests and reduces the likelihood of misuse.
 
 # Response Structure
@@ -78,6 +108,14 @@ Depending on the `Accept` header in the client's request, the API can return dat
 - JSON (default).
 - CSV, Excel, or PDF, with appropriate file names and formats for download.
 
+Every record is derived from the seed, its type and its position, so a seeded dataset can be paged through with the `offset` parameter: `offset=9000&range=100` returns records 9,000 to 9,099 without generating the ones before them, and the `Link` response header points at the next page.
+
+Seeded requests from authenticated users are deterministic, so their rendered output is kept in a disk cache and repeat requests are served from it directly. Identical requests that arrive while the first one is still generating wait for it and are served its result, so a burst of them costs a single generation. The `X-Cache` response header reports `HIT` or `MISS`.
+
+For large JSON responses, pass `stream=true` to receive the same `{"data": {...}}` document as a stream. Rows are generated and sent in chunks, so memory use stays flat and the first bytes arrive before generation finishes.
+
+Before anything is generated, the size and time of the response are estimated from a cost model calibrated per format and type (`manage.py calibrate_cost_model`). JSON responses too large to build in memory are streamed automatically, and requests in other formats that would take too long or too much memory are rejected with the estimate and a suggestion to use a streamed format. Pass `dry_run=true` to get only the estimate and the chosen output strategy (`memory`, `stream`, `file` or `reject`); dry runs don't spend the row budget.
+
 # File Naming Conventions 
 The file format and structure of the response will depend on the `format` quer parameter and will follow thes conventions.
 - JSON Format (Default)
@@ -105,8 +143,16 @@ The file format and structure of the response will depend on the `format` quer p
   - When the format query parameter is set to pdf, the response will be returned as a single PDF file containing all the requested data types in a formatted layout.
   - File Naming Convention: The PDF file will be named data.pdf
 
+- Parquet and Arrow Formats:
+  - When the `format` query parameter is set to `parquet` or `arrow`, the response will be returned as a `.zip` file containing one typed, columnar file per type requested: Apache Parquet (`<type>.parquet`) or Arrow IPC (`<type>.arrow`). Numbers keep their numeric types, so the files load straight into DataFrames without parsing.
+  - File Naming Convention: The zip file will be named `data_parquet.zip` or `data_arrow.zip`.
+
+- NDJSON Format:
+  - When the `format` query parameter is set to `ndjson`, the response is streamed as newline-delimited JSON (`application/x-ndjson`). Each line is one record tagged with its type, e.g. `{"type": "person", "data": {...}}`, so clients can parse it row by row.
+  - File Naming Convention: The file will be named `data.ndjson`
+
 # Extensibility
-This API is designed to be easily extendable. New data types can be added by implementing additional methods in the `DataGenerator` class and mapping them to query parameters in the `faker_methods` dictionary. For instance, adding a `vehicle` data type would involve creating a `generate_vehicle_data` method and updating the mapping to include `"vehicle": self.generate_vehicle_data`.
+This API is designed to be easily extendable. New data types can be added by registering a `DataSchema` in `helpers.schemas` that maps each field name to a field spec (`PoolField`, `IntField`, `ChoiceField`, `ConcatField` or `CustomField`). For instance, adding a `vehicle` data type would involve calling `register(DataSchema("vehicle", {...}))`; the new type is then accepted by the `type` parameter automatically.
 """,
     summary="This API endpoint provides a flexible way to generate randomized mock data based on the specified Type query parameter",
     # responses={200: OpenApiTypes.OBJECT},
@@ -130,7 +176,7 @@ This API is designed to be easily extendable. New data types can be added by imp
             required=False,
             description=(
                 "Specifies the response format. Defaults to `json`. "
-                "_Available Values_: `json`, `csv`, `pdf`, `excel`."
+                "_Available Values_: `json`, `csv`, `pdf`, `excel`, `ndjson`, `parquet`, `arrow`."
             ),
         ),
         OpenApiParameter(
@@ -154,6 +200,51 @@ This API is designed to be easily extendable. New data types can be added by imp
                 "Authenticated users with this parameter receive consistent results. (`For paid users only`)"
             ),
         ),
+        OpenApiParameter(
+            name="fields",
+            type=str,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            description=(
+                "Comma-separated list of fields to include, e.g. `fields=name,email`. "
+                "Only these fields are generated. Each field must exist on at least "
+                "one requested type. Defaults to all fields."
+            ),
+        ),
+        OpenApiParameter(
+            name="offset",
+            type=int,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            description=(
+                "Index of the first record to return. Defaults to `0`. "
+                "Together with **Range** and **Seed** this pages through one large, "
+                "reproducible dataset; seeded responses include a `Link` header "
+                "pointing at the next page."
+            ),
+        ),
+        OpenApiParameter(
+            name="stream",
+            type=bool,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            description=(
+                "When `true` and the response format is JSON, the document is streamed "
+                "as it is generated instead of being built in memory first. "
+                "Recommended for large ranges."
+            ),
+        ),
+        OpenApiParameter(
+            name="dry_run",
+            type=bool,
+            location=OpenApiParameter.QUERY,
+            required=False,
+            description=(
+                "When `true`, nothing is generated; the response is the estimated "
+                "rows, bytes, seconds and memory of the request and how it would "
+                "be produced."
+            ),
+        ),
     ],
     responses={
         200: OpenApiResponse(
@@ -187,34 +278,74 @@ This API is designed to be easily extendable. New data types can be added by imp
 )
 class DummyData(APIView, DataGenerator):
 
-    fake = Faker()
-    fake.add_provider(faker_commerce.Provider)
     permission_classes = [IsAuthenticatedOrReadOnly]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     renderer_classes = [
         JSONRenderer,
         BrowsableAPIRenderer,
         ExcelRenderer,
         PdfRenderer,
         CsvRenderer,
+        NdjsonRenderer,
+        ParquetRenderer,
+        ArrowRenderer,
     ]
 
+    def perform_authentication(self, request):
+        with phase(request, "auth"):
+            super().perform_authentication(request)
+
+    def check_throttles(self, request):
+        # Only the request rate is checked up front; rows are charged by
+        # check_row_budget() once the request is known to generate them
+        rate_throttle = self.get_throttles()[0]
+        with phase(request, "throttle"):
+            if not rate_throttle.allow_request(request, self):
+                self.throttled(request, rate_throttle.wait())
+
+    def check_row_budget(self, request):
+        row_throttle = self.get_throttles()[1]
+        with phase(request, "throttle"):
+            if not row_throttle.allow_request(request, self):
+                self.throttled(request, row_throttle.wait())
+
+    def iter_shards(self, schemas_to_use, data_range, offset):
+        return timed_iter(
+            self.request,
+            "generate",
+            shard_executor.iter_shards(self, schemas_to_use, data_range, offset=offset),
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Point seeded responses at the next window of the same dataset
+        next_offset = getattr(self, "next_offset", None)
+        if next_offset is not None and response.status_code == status.HTTP_200_OK:
+            params = request.query_params.copy()
+            params["offset"] = str(next_offset)
+            next_url = request.build_absolute_uri(
+                f"{request.path}?{params.urlencode()}"
+            )
+            response["Link"] = f'<{next_url}>; rel="next"'
+
+        for throttle in getattr(self, "throttles", ()):
+            for header, value in throttle.get_headers().items():
+                response[header] = value
+        return response
+
     def get_throttles(self):
-        if not self.request.user.is_authenticated:
-            return [AnonUserRateThrottle()]
-        elif self.request.user.is_paiduser:
-            return [PaidUserRateThrottle()]
-        return [FreeUserRateThrottle()]
+        # Built once per request, so the throttle that checked the request is
+        # the one finalize_response reads the rate limit headers from
+        if not hasattr(self, "throttles"):
+            if not self.request.user.is_authenticated:
+                self.throttles = [AnonUserRateThrottle(), AnonUserRowThrottle()]
+            elif self.request.user.is_paiduser:
+                self.throttles = [PaidUserRateThrottle(), PaidUserRowThrottle()]
+            else:
+                self.throttles = [FreeUserRateThrottle(), FreeUserRowThrottle()]
+        return self.throttles
 
     def get(self, request):
-        # Mapping of query parameter values to Faker methods
-        faker_methods = {
-            "person": self.generate_person_data,
-            "product": self.generate_product_data,
-            "weather": self.generate_weather_data,
-            # Add more mappings as needed
-        }
-
         throttle_class = self.get_throttles()[0]
         max_data_range = throttle_class.max_data_range
         # Get all instances of the 'type' query parameter
@@ -224,6 +355,8 @@ class DummyData(APIView, DataGenerator):
         data_range = min(max_data_range, data_range)
         seed_value = request.query_params.get("seed") or device_id(request)
 
+        # The seed actually applied, when the output is reproducible
+        applied_seed = None
         try:
             if seed_value and request.user.is_authenticated:
                 if request.user.is_paiduser:
@@ -232,9 +365,11 @@ class DummyData(APIView, DataGenerator):
                     hashed_seed = int(
                         hashlib.md5(combined_seed.encode("utf-8")).hexdigest(), 16
                     ) % (10**8)
-                    self.fake.seed_instance(hashed_seed)
+                    self.seed(hashed_seed)
+                    applied_seed = hashed_seed
                 else:
-                    self.fake.seed_instance(seed_value)
+                    self.seed(seed_value)
+                    applied_seed = seed_value
         except TypeError:
             pass
 
@@ -245,40 +380,287 @@ class DummyData(APIView, DataGenerator):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Validate all provided types and collect Faker methods
-        faker_methods_to_use = []
+        # Validate all provided types against the schema registry
+        schemas_to_use = []
         for data_type in data_types:
-            faker_method = faker_methods.get(data_type.lower())
-            if not faker_method:
+            schema = SCHEMAS.get(data_type.lower())
+            if not schema:
                 return Response(
                     {"error": f"Data type '{data_type}' is not supported."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            faker_methods_to_use.append((data_type, faker_method))
-
-        # Generate the data using the Faker methods
-        grouped_data = {data_type: [] for data_type, _ in faker_methods_to_use}
-        for _ in range(data_range):
+            # Types are keyed by their registered name, so repeats in any
+            # case would only duplicate work (and clash as sheet/file names)
+            if schema.name not in [name for name, *_ in schemas_to_use]:
+                schemas_to_use.append((schema.name, schema, None))
+
+        # Optional projection: only the requested columns are ever generated
+        requested_fields = sorted(
+            {
+                field.strip().lower()
+                for value in request.query_params.getlist("fields")
+                for field in value.split(",")
+                if field.strip()
+            }
+        )
+        if requested_fields:
+            available_fields = set()
+            for index, (data_type, schema, _) in enumerate(schemas_to_use):
+                type_fields = schema.field_names
+                available_fields.update(type_fields)
+                fields = tuple(
+                    field for field in type_fields if field in requested_fields
+                )
+                if not fields:
+                    return Response(
+                        {
+                            "error": f"None of the requested fields are available for type '{data_type}'."
+                        },
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                schemas_to_use[index] = (data_type, schema, fields)
+
+            unknown_fields = [
+                field for field in requested_fields if field not in available_fields
+            ]
+            if unknown_fields:
+                return Response(
+                    {
+                        "error": f"Field(s) {', '.join(unknown_fields)} not available for the requested types."
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-            for data_type, faker_method in faker_methods_to_use:
-                grouped_data[data_type].append(faker_method())
+        # Rows are addressable by index, so any window of the dataset can be
+        # generated directly without producing the rows before it.
+        try:
+            offset = int(request.query_params.get("offset", 0))
+            if offset < 0:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": "Query parameter 'offset' must be a non-negative integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Without a seed parameter the seed comes from device_id(), which is
+        # random per request, so only seeded requests can be paged through
+        reproducible = applied_seed is not None and bool(
+            request.query_params.get("seed")
+        )
+        if reproducible:
+            self.next_offset = offset + data_range
+
+        timer = get_timer(request)
+        if timer is not None:
+            # Tags the request's phase metrics
+            timer.labels = {
+                "format": request.accepted_renderer.format,
+                "types": ",".join(
+                    sorted({name.lower() for name, *_ in schemas_to_use})
+                ),
+            }
+            timer.details = {"range": data_range, "offset": offset}
 
-        filename = "data"
         renderer = request.accepted_renderer
+        stream = request.query_params.get("stream", "").lower() in ("true", "1")
+        estimate = cost_model.estimate(schemas_to_use, data_range, renderer.format)
+        output = self.plan_output(renderer, estimate, stream)
+
+        dry_run = request.query_params.get("dry_run", "").lower() in ("true", "1")
+        if dry_run or output == "reject":
+            # Estimates are plain JSON whatever format they were asked for
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        if dry_run:
+            return Response({"estimate": estimate, "output": output})
+        if output == "reject":
+            return Response(
+                {
+                    "error": "The request is too large to render in this format. "
+                    "Request fewer rows, or use format=csv, format=ndjson or "
+                    "JSON with stream=true.",
+                    "estimate": estimate,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        self.check_row_budget(request)
+
+        # Stream the JSON document chunk by chunk instead of building it in memory
+        if output == "stream" and type(renderer) is JSONRenderer:
+            return StreamingHttpResponse(
+                stream_json(
+                    [data_type for data_type, *_ in schemas_to_use],
+                    self.iter_shards(schemas_to_use, data_range, offset),
+                ),
+                content_type="application/json",
+            )
+
+        # NDJSON is row oriented, so it is always streamed from the generators
+        if isinstance(renderer, NdjsonRenderer):
+            response = StreamingHttpResponse(
+                stream_ndjson(self.iter_shards(schemas_to_use, data_range, offset)),
+                content_type=NdjsonRenderer.media_type,
+            )
+            response["Content-Disposition"] = "attachment; filename=data.ndjson"
+            return response
+
+        filename = self.get_filename(renderer)
+
+        # Seeded requests are deterministic, so their rendered output can be
+        # served straight from the artifact cache on repeat requests.
+        cache_key = None
+        if (
+            reproducible
+            and type(renderer) in CACHEABLE_RENDERERS
+            and output != "stream"
+        ):
+            cache_key = artifact_cache.make_key(
+                GENERATOR_VERSION,
+                # The numpy seed the rows derive from, rather than the seed
+                # parameter, which is combined with the user id for paid users
+                self.base_seed,
+                [name for name, *_ in schemas_to_use],
+                requested_fields,
+                offset,
+                data_range,
+                renderer.format,
+                # Includes parameters that change the output, e.g. indent=4
+                request.accepted_media_type,
+            )
+            with phase(request, "cache"):
+                cached_path = artifact_cache.get(cache_key)
+            if cached_path:
+                return self.file_response(cached_path, renderer, filename, "HIT")
+
+            # Identical requests arriving together (e.g. a CI matrix) queue up
+            # here, and all but the first are served the entry it renders.
+            with ExitStack() as stack:
+                with phase(request, "wait"):
+                    stack.enter_context(
+                        artifact_cache.lock(cache_key, settings.ARTIFACT_LOCK_TIMEOUT)
+                    )
+                    cached_path = artifact_cache.get(cache_key)
+                if cached_path:
+                    return self.file_response(cached_path, renderer, filename, "HIT")
+                cached_path = self.render_to_cache(
+                    cache_key, renderer, schemas_to_use, data_range, offset
+                )
+            return self.file_response(cached_path, renderer, filename, "MISS")
+
+        # Uncached CSV exports are written row by row into a zip that is
+        # streamed to the client while it is being compressed.
+        if isinstance(renderer, CsvRenderer):
+            response = StreamingHttpResponse(
+                stream_csv_zip(self.iter_shards(schemas_to_use, data_range, offset)),
+                content_type=CsvRenderer.media_type,
+            )
+            response["Content-Disposition"] = f"attachment; filename={filename}"
+            return response
+
+        # Workbooks are written shard by shard straight to a temp file that
+        # is deleted once sent.
+        if isinstance(renderer, ExcelRenderer):
+            shards = self.iter_shards(schemas_to_use, data_range, offset)
+            workbook_file = tempfile.TemporaryFile()
+            with phase(request, "render"):
+                renderer.write_workbook(shards, workbook_file)
+            workbook_file.seek(0)
+            return self.file_response(workbook_file, renderer, filename)
+
+        response = TimedResponse(
+            {"data": self.generate_data(schemas_to_use, data_range, offset)}
+        )
+        if filename:
+            # Content negotiation will select the ExcelRenderer if the client requests 'excel'
+            response["Content-Disposition"] = f"attachment; filename={filename}"
+        return response
+
+    def generate_data(self, schemas_to_use, data_range, offset):
+        # Generate every type in fixed-size shards; large requests fan the
+        # shards out over the process pool when it is enabled.
+        workers = 0
+        if data_range * len(schemas_to_use) >= settings.PARALLEL_GENERATION_MIN_ROWS:
+            workers = settings.GENERATION_WORKERS
+        with phase(self.request, "generate"):
+            return shard_executor.generate(
+                self, schemas_to_use, data_range, workers, offset
+            )
+
+    def render_to_cache(self, cache_key, renderer, schemas_to_use, data_range, offset):
+        """Render the response into the artifact cache; returns the entry's path."""
+        request = self.request
+        if isinstance(renderer, ExcelRenderer):
+            shards = self.iter_shards(schemas_to_use, data_range, offset)
+            with phase(request, "render"):
+                with artifact_cache.open_for_write(cache_key) as cache_file:
+                    renderer.write_workbook(shards, cache_file)
+            return artifact_cache.path_for(cache_key)
+
+        response_data = {"data": self.generate_data(schemas_to_use, data_range, offset)}
+        with phase(request, "render"):
+            content = renderer.render(
+                response_data,
+                request.accepted_media_type,
+                self.get_renderer_context(),
+            )
+        with phase(request, "cache"):
+            return artifact_cache.put(cache_key, content)
+
+    @staticmethod
+    def plan_output(renderer, estimate, stream):
+        """
+        How the response for `estimate` will be produced: "stream",
+        "file" (written to disk), "memory", or "reject" when building it in
+        memory would take too long or too much memory.
+        """
+        if isinstance(renderer, ExcelRenderer):
+            return "file"
+        if isinstance(renderer, NdjsonRenderer):
+            return "stream"
+        streamable = type(renderer) is JSONRenderer or isinstance(renderer, CsvRenderer)
+        if stream and type(renderer) is JSONRenderer:
+            return "stream"
+
+        # The generated rows and the rendered response are both held at once
+        materialized = estimate["memory_bytes"] + estimate["bytes"]
+        too_slow = estimate["seconds"] > settings.MAX_ESTIMATED_SECONDS
+        if streamable and (
+            too_slow or materialized > settings.STREAMING_THRESHOLD_BYTES
+        ):
+            return "stream"
+        if too_slow or materialized > settings.MAX_ESTIMATED_MEMORY_BYTES:
+            return "reject"
+        return "memory"
+
+    @staticmethod
+    def get_filename(renderer):
         if isinstance(renderer, PdfRenderer):
-            filename += ".pdf"
+            return "data.pdf"
         elif isinstance(renderer, CsvRenderer):
-            filename += "_csv.zip"
+            return "data_csv.zip"
         elif isinstance(renderer, ExcelRenderer):
-            filename += ".xlsx"
+            return "data.xlsx"
+        elif isinstance(renderer, (ParquetRenderer, ArrowRenderer)):
+            return f"data_{renderer.format}.zip"
+        return None
+
+    @staticmethod
+    def file_response(file, renderer, filename, cache_status=None):
+        # FileResponse hands the open file to the server (wsgi.file_wrapper /
+        # sendfile) instead of reading it into memory.
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f"; charset={renderer.charset}"
+        if isinstance(file, Path):
+            file = open(file, "rb")
+        response = FileResponse(file, content_type=content_type)
+        if filename:
+            response["Content-Disposition"] = f"attachment; filename={filename}"
         else:
-            response_data = {"data": grouped_data}
-            return Response(response_data)
-
-        response_data = {"data": grouped_data}
-        response = Response(response_data)
-        # Content negotiation will select the ExcelRenderer if the client requests 'excel'
-        response["Content-Disposition"] = f"attachment; filename={filename}"
+            # Don't leak the cache file name for inline (JSON) responses
+            del response["Content-Disposition"]
+        if cache_status:
+            response["X-Cache"] = cache_status
         return response
 
 
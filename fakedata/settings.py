@@ -69,6 +69,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "commons.middleware.RequestTimingMiddleware",
+    "commons.middleware.SamplingProfilerMiddleware",
+    "commons.middleware.MemoryTrackingMiddleware",
 ]
 
 ROOT_URLCONF = "fakedata.urls"
@@ -140,6 +142,67 @@ USE_TZ = True
 STATIC_URL = "static/"
 # STATICFILES_DIRS = [BASE_DIR / "static"]
 
+# Disk cache for rendered, seeded /data/dummy/ responses
+ARTIFACT_CACHE_DIR = BASE_DIR / "cache" / "artifacts"
+ARTIFACT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# How long a request waits for an identical one that is rendering the same
+# entry before rendering it itself
+ARTIFACT_LOCK_TIMEOUT = 120
+
+# SQLite database holding throttle state and usage counters, shared by every
+# worker process on the host (see commons.shared_store)
+SHARED_STORE_PATH = os.getenv(
+    "SHARED_STORE_PATH", BASE_DIR / "cache" / "shared.sqlite3"
+)
+
+# Fraction of requests RequestTimingMiddleware logs (0 disables logging; every
+# request is still recorded in the metrics served at /metrics)
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", 0.01))
+# Bearer token /metrics requires. Without one, /metrics is only served to
+# local clients and staff sessions.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Sampling profiler (commons.middleware.SamplingProfilerMiddleware): requests
+# sending PROFILE_HEADER are profiled if they come from a staff user or the
+# header's value is PROFILE_TOKEN, as is a random PROFILE_SAMPLE_RATE fraction
+# of all requests. Profiles are kept in PROFILE_DIR and listed in the admin;
+# only the latest PROFILE_KEEP are kept.
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL = 0.005
+PROFILE_DIR = BASE_DIR / "cache" / "profiles"
+PROFILE_KEEP = 200
+
+# Per-request peak memory (commons.middleware.MemoryTrackingMiddleware):
+# "rss" (near free, fine for production), "tracemalloc" (Python allocations
+# only, slows rendering several times over) or empty to disable. Requests
+# peaking above MEMORY_LOG_THRESHOLD bytes are logged.
+MEMORY_TRACKING = os.getenv("MEMORY_TRACKING", "")
+MEMORY_TRACKING_SAMPLE_RATE = float(os.getenv("MEMORY_TRACKING_SAMPLE_RATE", 1))
+MEMORY_LOG_THRESHOLD = 256 * 1024 * 1024
+
+# Cost model used to estimate /data/dummy/ requests before generating them
+# (refresh with `manage.py calibrate_cost_model`). JSON responses estimated
+# to hold more than STREAMING_THRESHOLD_BYTES in memory are streamed instead;
+# requests estimated above MAX_ESTIMATED_MEMORY_BYTES or MAX_ESTIMATED_SECONDS
+# in a format that can't be streamed are rejected.
+COST_MODEL_PATH = BASE_DIR / "helpers" / "cost_model.json"
+STREAMING_THRESHOLD_BYTES = 64 * 1024 * 1024
+MAX_ESTIMATED_MEMORY_BYTES = 1024 * 1024 * 1024
+MAX_ESTIMATED_SECONDS = 60
+
+# Worker processes used to generate large /data/dummy/ requests in parallel
+# (0 generates everything in the request thread). Output is identical either way.
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", 0))
+PARALLEL_GENERATION_MIN_ROWS = 20000
+
+# Build the sampling pools and renderer imports when the WSGI/ASGI
+# application is loaded. Only worth it with a server that loads the app
+# before forking its workers (e.g. `gunicorn --preload fakedata.wsgi`);
+# otherwise every worker would pay for it at boot, so it is off by default.
+WARM_UP_ON_LOAD = os.getenv("WARM_UP_ON_LOAD", "0") == "1"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -202,6 +265,11 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
+# Users loaded by commons.authentication.CachedJWTAuthentication are kept in
+# memory for USER_CACHE_TTL seconds (saving a user invalidates them at once)
+USER_CACHE_TTL = 300
+USER_CACHE_MAX_SIZE = 10000
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 PAYSTACK_WEBHOOK_SECRET = os.getenv("PAYSTACK_WEBHOOK_SECRET")
@@ -223,9 +291,7 @@ SPECTACULAR_SETTINGS = {
     "SWAGGER_UI_DIST": "SIDECAR",
     "SWAGGER_UI_FAVICON_HREF": "SIDECAR",
     "REDOC_DIST": "SIDECAR",
-    "AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "AUTHENTICATION_CLASSES": ("commons.authentication.CachedJWTAuthentication",),
     "SWAGGER_UI_SETTINGS": {
         "persistAuthorization": True,
         "deepLinking": True,
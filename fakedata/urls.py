@@ -25,6 +25,7 @@ from drf_spectacular.views import (
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 
+from commons.metrics import metrics_view
 from helpers.urls_list import UrlsListView
 from payment.views import PaystackWebhookView
 from users.views import CreateUserViewSet, MyTokenObtainPairView
@@ -36,6 +37,7 @@ urlpatterns = [
     path("data/", include("data.urls")),
     path("order/", include("order.urls")),
     path("payments/", include("payment.urls")),
+    path("metrics", metrics_view, name="metrics"),
     path("webhook/paystack/", PaystackWebhookView.as_view(), name="verify_payment"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     # Optional UI:
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "fakedata.settings")
 
 application = get_wsgi_application()
+
+if settings.WARM_UP_ON_LOAD:
+    from commons.warmup import warm_up
+
+    warm_up()
@@ -0,0 +1,67 @@
+import json
+import threading
+
+from django.conf import settings
+
+# Linear cost model for /data/dummy/ requests, calibrated by the
+# calibrate_cost_model management command. For every output format and data
+# type it stores the response bytes and the generation + rendering seconds
+# per row (plus a fixed overhead per format), and for every type the memory a
+# materialized row occupies. Estimates scale each type's cost by the share of
+# its fields that were requested.
+
+# Formats without calibration data are estimated like JSON
+DEFAULT_FORMAT = "json"
+
+
+def per_row(costs, data_type):
+    # Types registered after the last calibration cost the average type
+    cost = costs.get(data_type)
+    if cost is None:
+        cost = sum(costs.values()) / len(costs)
+    return cost
+
+
+class CostModel:
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self._lock = threading.Lock()
+
+    @property
+    def data(self):
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    with open(self.path) as model_file:
+                        self._data = json.load(model_file)
+        return self._data
+
+    def estimate(self, jobs, data_range, format):
+        """
+        Predict the cost of generating `data_range` rows of every job
+        (`(data_type, schema, fields)` tuples, as used by helpers.sharding)
+        and rendering them as `format`.
+        """
+        formats = self.data["formats"]
+        model = formats.get(format, formats[DEFAULT_FORMAT])
+
+        response_bytes = model["bytes_overhead"]
+        seconds = model["seconds_overhead"]
+        memory_bytes = 0
+        for _, schema, fields in jobs:
+            share = len(fields) / len(schema.field_names) if fields else 1
+            rows = data_range * share
+            response_bytes += rows * per_row(model["bytes_per_row"], schema.name)
+            seconds += rows * per_row(model["seconds_per_row"], schema.name)
+            memory_bytes += rows * per_row(self.data["memory_per_row"], schema.name)
+
+        return {
+            "rows": data_range * len(jobs),
+            "bytes": int(response_bytes),
+            "seconds": round(seconds, 3),
+            "memory_bytes": int(memory_bytes),
+        }
+
+
+cost_model = CostModel(settings.COST_MODEL_PATH)
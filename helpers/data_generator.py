@@ -1,44 +1,133 @@
-import faker_commerce
-from faker import Faker
+import hashlib
+import secrets
+import threading
 
+import numpy as np
+
+from helpers.schemas import SCHEMAS
+
+# Number of values drawn from Faker for each sampling pool. Composite fields
+# (names, emails, addresses) are assembled from several pools so the number of
+# distinct values is far larger than the pool size itself.
+POOL_SIZE = 1024
+
+
+def seed_to_int(seed_value):
+    """Turn any seed value (int or str) into a non-negative int for numpy."""
+    if isinstance(seed_value, int):
+        return abs(seed_value)
+    return int(hashlib.md5(str(seed_value).encode("utf-8")).hexdigest(), 16) % (10**8)
+
+
+def product_name(fake):
+    # Same shape as faker_commerce's ecommerce_name, which picks the final
+    # form with the global `random` module and so ignores Faker seeding.
+    from faker_commerce import PRODUCT_DATA
+
+    product = fake.random_element(PRODUCT_DATA["product"])
+    adjective = fake.random_element(PRODUCT_DATA["adjective"])
+    material = fake.random_element(PRODUCT_DATA["material"])
+    return fake.random_element(
+        (
+            product,
+            f"{adjective} {product}",
+            f"{material} {product}",
+            f"{adjective} {material} {product}",
+        )
+    )
+
+
+def create_faker():
+    # Faker loads its locale and provider tables on import, so it is only
+    # imported once the pools are built
+    import faker_commerce
+    from faker import Faker
 
-class DataGenerator:
     fake = Faker()
     fake.add_provider(faker_commerce.Provider)
+    return fake
 
-    def generate_phone_num(self):
-        country_code = self.fake.country_calling_code()
-        phone_num = self.fake.numerify("##########")
-        return f"{country_code}{phone_num}"
 
-    def generate_person_data(self):
-        return {
-            "name": self.fake.name(),
-            "age": self.fake.random_int(min=18, max=80),
-            "gender": self.fake.random_element(elements=("Male", "Female")),
-            "nationality": self.fake.country(),
-            "phone_number": self.generate_phone_num(),
-            "address": self.fake.address().replace("\n", " ").strip(),
-            "email": self.fake.email(domain="gmail.com"),
-        }
+class DataGenerator:
+    # Entropy for the batch methods. Each column gets its own stream spawned
+    # from it, so row i of a batch doesn't depend on how many rows are drawn.
+    seed_sequence = None
+    # Integer seed every shard's sub-seed is derived from (see helpers.sharding)
+    base_seed = None
+
+    # Precomputed value pools shared by every instance, built on first use
+    _pools = None
+    _pools_lock = threading.Lock()
+
+    def seed(self, seed_value):
+        # All seeding state lives on the instance (one per request), so
+        # concurrent requests can't affect each other's output
+        self.base_seed = seed_to_int(seed_value)
+        self.seed_sequence = np.random.SeedSequence(self.base_seed)
+
+    def get_base_seed(self):
+        # Unseeded generators get a fresh random base seed
+        if self.base_seed is None:
+            self.base_seed = secrets.randbits(32)
+        return self.base_seed
+
+    @classmethod
+    def get_pools(cls):
+        if cls._pools is None:
+            with cls._pools_lock:
+                if cls._pools is None:
+                    cls._pools = cls.build_pools()
+        return cls._pools
+
+    @staticmethod
+    def build_pools():
+        # A fixed seed keeps the pools identical across processes, so seeded
+        # batches are reproducible everywhere.
+        fake = create_faker()
+        fake.seed_instance(0)
+
+        def pool(method, size=POOL_SIZE):
+            return np.array([method() for _ in range(size)], dtype=object)
 
-    def generate_weather_data(self):
         return {
-            "temperature": f"{self.fake.random_int(min=25, max=45)}\u00b0C",
-            "humidity": f"{self.fake.random_int(min=0, max=100)}%",
-            "condition": self.fake.random_element(
-                elements=("Sunny", "Rainy", "Cloudy", "Snowy")
+            "first_name": pool(fake.first_name),
+            "last_name": pool(fake.last_name),
+            "country": pool(fake.country),
+            "calling_code": pool(fake.country_calling_code),
+            "street": pool(fake.street_address),
+            "city": pool(fake.city),
+            "city_line": pool(
+                lambda: f"{fake.city()}, {fake.state_abbr()} {fake.postcode()}"
             ),
-            "wind_speed": f"{round(self.fake.random_number(digits=2, fix_len=True) / 10, 1)} km/h",
-            "city": self.fake.city(),
-            "country": self.fake.country(),
+            "product_name": pool(lambda: product_name(fake)),
+            "product_category": pool(fake.ecommerce_category),
         }
 
-    def generate_product_data(self):
-        return {
-            "name": self.fake.ecommerce_name(),
-            "category": self.fake.ecommerce_category(),
-            "price": f"${round(self.fake.random_number(digits=5) / 100, 2)}",
-            "stock": self.fake.random_int(min=0, max=1000),
-            "sku": self.fake.ean13(),
-        }
+    # Batch generation: each type is described by a schema in helpers.schemas
+    # and compiled into a batch function that builds whole columns at once by
+    # sampling indices into the precomputed pools.
+
+    def column_rng(self, key):
+        # Every column draws from its own stream keyed by name, so a column's
+        # values don't depend on which other columns are generated.
+        if self.seed_sequence is None:
+            self.seed_sequence = np.random.SeedSequence()
+        column_key = int(hashlib.md5(key.encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(
+            np.random.SeedSequence(
+                self.seed_sequence.entropy,
+                spawn_key=(*self.seed_sequence.spawn_key, column_key),
+            )
+        )
+
+    def generate_batch(self, data_type, n, fields=None):
+        return SCHEMAS[data_type].batch(self, n, fields)
+
+    def generate_person_batch(self, n, fields=None):
+        return self.generate_batch("person", n, fields)
+
+    def generate_weather_batch(self, n, fields=None):
+        return self.generate_batch("weather", n, fields)
+
+    def generate_product_batch(self, n, fields=None):
+        return self.generate_batch("product", n, fields)
@@ -0,0 +1,240 @@
+import numpy as np
+
+# Declarative data-type schemas.
+#
+# A schema maps each output field to a field spec describing how its column is
+# produced (pool sampling, integer range, fixed choices, ...). Schemas are
+# compiled once at import time into plain batch functions, so generating rows
+# involves no per-field lookups or attribute resolution. Registering a schema
+# is all it takes to expose a new `type` on /data/dummy/.
+
+# Part of the artifact cache key. Bump it whenever a change here or in
+# helpers.sharding alters the rows generated for a given seed, so entries
+# rendered by an earlier release are never served next to fresh pages.
+GENERATOR_VERSION = 1
+
+
+class Field:
+    def compile(self, key):
+        """Return a `column(generator, n)` function producing `n` values."""
+        raise NotImplementedError
+
+
+class PoolField(Field):
+    """Sample values from one of DataGenerator's precomputed pools."""
+
+    def __init__(self, pool_name):
+        self.pool_name = pool_name
+
+    def compile(self, key):
+        pool_name = self.pool_name
+
+        def column(generator, n):
+            pool = generator.get_pools()[pool_name]
+            return pool[generator.column_rng(key).integers(0, len(pool), size=n)]
+
+        return column
+
+
+class ChoiceField(Field):
+    """Pick uniformly from a fixed set of values."""
+
+    def __init__(self, elements):
+        self.elements = np.array(elements, dtype=object)
+
+    def compile(self, key):
+        elements = self.elements
+        size = len(elements)
+
+        def column(generator, n):
+            return elements[generator.column_rng(key).integers(0, size, size=n)]
+
+        return column
+
+
+class IntField(Field):
+    """Integers in `[low, high]` (inclusive, like Faker's random_int)."""
+
+    def __init__(self, low, high, format=None):
+        self.low = low
+        self.high = high
+        self.format = format
+
+    def compile(self, key):
+        low, high, format = self.low, self.high + 1, self.format
+
+        if format is None:
+
+            def column(generator, n):
+                return generator.column_rng(key).integers(low, high, size=n).tolist()
+
+        else:
+
+            def column(generator, n):
+                values = generator.column_rng(key).integers(low, high, size=n)
+                return [format(value) for value in values.tolist()]
+
+        return column
+
+
+class ConcatField(Field):
+    """Join several named sub-fields (pool or choice fields) with a separator."""
+
+    def __init__(self, separator=" ", **parts):
+        self.separator = separator
+        self.parts = parts
+
+    def compile(self, key):
+        separator = self.separator
+        columns = [part.compile(f"{key}.{name}") for name, part in self.parts.items()]
+        first, rest = columns[0], columns[1:]
+
+        def column(generator, n):
+            values = first(generator, n)
+            for part in rest:
+                values = values + separator + part(generator, n)
+            return values
+
+        return column
+
+
+class CustomField(Field):
+    """Build the column with `function(generator, key, n)`."""
+
+    def __init__(self, function):
+        self.function = function
+
+    def compile(self, key):
+        function = self.function
+
+        def column(generator, n):
+            return function(generator, key, n)
+
+        return column
+
+
+def phone_number_column(generator, key, n):
+    pool = generator.get_pools()["calling_code"]
+    digits = generator.column_rng(f"{key}.digits").integers(0, 10**10, size=n)
+    codes = pool[generator.column_rng(f"{key}.code").integers(0, len(pool), size=n)]
+    return [f"{code}{num:010d}" for code, num in zip(codes, digits.tolist())]
+
+
+def email_column(generator, key, n):
+    pools = generator.get_pools()
+    first_pool, last_pool = pools["first_name"], pools["last_name"]
+    first = first_pool[
+        generator.column_rng(f"{key}.first").integers(0, len(first_pool), size=n)
+    ]
+    last = last_pool[
+        generator.column_rng(f"{key}.last").integers(0, len(last_pool), size=n)
+    ]
+    suffix = generator.column_rng(f"{key}.suffix").integers(0, 100, size=n).tolist()
+    style = generator.column_rng(f"{key}.style").integers(0, 3, size=n).tolist()
+    emails = []
+    for first_name, last_name, number, kind in zip(first, last, suffix, style):
+        if kind == 0:
+            user = f"{first_name}{last_name}"
+        elif kind == 1:
+            user = f"{last_name}{first_name}"
+        else:
+            user = f"{first_name}{number:02d}"
+        emails.append(f"{user.lower()}@gmail.com")
+    return emails
+
+
+EAN13_WEIGHTS = np.tile([1, 3], 6)
+EAN13_POWERS = 10 ** np.arange(12, 0, -1)
+
+
+def ean13_column(generator, key, n):
+    digits = generator.column_rng(key).integers(0, 10, size=(n, 12))
+    check = (10 - (digits @ EAN13_WEIGHTS) % 10) % 10
+    values = digits @ EAN13_POWERS + check
+    return [f"{value:013d}" for value in values.tolist()]
+
+
+class DataSchema:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = dict(fields)
+        self.field_names = tuple(self.fields)
+        self.batch = self.compile()
+
+    def compile(self):
+        columns = tuple(
+            (field_name, field.compile(field_name))
+            for field_name, field in self.fields.items()
+        )
+
+        def batch(generator, n, fields=None):
+            selected = (
+                columns
+                if fields is None
+                else [column for column in columns if column[0] in fields]
+            )
+            keys = [field_name for field_name, _ in selected]
+            values = [column(generator, n) for _, column in selected]
+            return [dict(zip(keys, row)) for row in zip(*values)]
+
+        return batch
+
+
+# Registry of every data type, keyed by its lowercase `type` value
+SCHEMAS = {}
+
+
+def register(schema):
+    SCHEMAS[schema.name] = schema
+    return schema
+
+
+register(
+    DataSchema(
+        "person",
+        {
+            "name": ConcatField(
+                first=PoolField("first_name"), last=PoolField("last_name")
+            ),
+            "age": IntField(18, 80),
+            "gender": ChoiceField(("Male", "Female")),
+            "nationality": PoolField("country"),
+            "phone_number": CustomField(phone_number_column),
+            "address": ConcatField(
+                street=PoolField("street"), city=PoolField("city_line")
+            ),
+            "email": CustomField(email_column),
+        },
+    )
+)
+
+register(
+    DataSchema(
+        "product",
+        {
+            "name": PoolField("product_name"),
+            "category": PoolField("product_category"),
+            "price": IntField(
+                0, 99999, format=lambda value: f"${round(value / 100, 2)}"
+            ),
+            "stock": IntField(0, 1000),
+            "sku": CustomField(ean13_column),
+        },
+    )
+)
+
+register(
+    DataSchema(
+        "weather",
+        {
+            "temperature": IntField(25, 45, format=lambda value: f"{value}\u00b0C"),
+            "humidity": IntField(0, 100, format=lambda value: f"{value}%"),
+            "condition": ChoiceField(("Sunny", "Rainy", "Cloudy", "Snowy")),
+            "wind_speed": IntField(
+                10, 99, format=lambda value: f"{round(value / 10, 1)} km/h"
+            ),
+            "city": PoolField("city"),
+            "country": PoolField("country"),
+        },
+    )
+)
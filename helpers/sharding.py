@@ -0,0 +1,116 @@
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from helpers.data_generator import DataGenerator
+from helpers.schemas import SCHEMAS
+
+# Every dataset is a virtual sequence of rows per type, split into fixed-size
+# shards. Each shard has its own sub-seed derived from (seed, type, shard), and
+# every column within a shard has its own stream, so any row can be computed
+# from its index alone: the output is the same whether shards run one after
+# another in the request thread or spread across a process pool, and a window
+# at any offset costs only the rows up to its end within each shard.
+SHARD_SIZE = 1000
+
+
+def shard_bounds(offset, total, shard_size=SHARD_SIZE):
+    """
+    Yield `(shard_index, start, stop)` for the shards covering the rows
+    `[offset, offset + total)`, with `start`/`stop` relative to the shard.
+    """
+    position = offset
+    end = offset + total
+    while position < end:
+        shard_index, start = divmod(position, shard_size)
+        stop = min(shard_size, start + end - position)
+        yield shard_index, start, stop
+        position += stop - start
+
+
+def shard_seed_sequence(base_seed, data_type, shard_index):
+    type_key = int(hashlib.md5(data_type.lower().encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.SeedSequence([base_seed, type_key, shard_index])
+
+
+def generate_shard(
+    generator, schema_name, fields, base_seed, data_type, shard_index, start, stop
+):
+    generator.seed_sequence = shard_seed_sequence(base_seed, data_type, shard_index)
+    rows = SCHEMAS[schema_name].batch(generator, stop, fields)
+    return rows[start:] if start else rows
+
+
+def _generate_shard_in_worker(*shard):
+    return generate_shard(DataGenerator(), *shard)
+
+
+class ShardExecutor:
+    """
+    Lazily started process pool that generates shards in parallel.
+
+    Workers are spawned (not forked) so they never inherit locks held by
+    request threads, and build their sampling pools once at start-up.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_executor(self, workers):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=DataGenerator.get_pools,
+                    )
+        return self._executor
+
+    def iter_shards(self, generator, jobs, total, workers=0, offset=0):
+        """
+        Yield `(data_type, rows)` for every shard of every job, in order.
+
+        `jobs` is a list of `(data_type, schema, fields)` tuples, where
+        `fields` limits the generated columns (None for all), and the rows
+        cover `[offset, offset + total)` of each type's dataset. With
+        `workers` set, shards are submitted to the process pool up front and
+        collected in order; otherwise they are generated in the calling thread.
+        """
+        base_seed = generator.get_base_seed()
+        shards = [
+            (
+                data_type,
+                (schema.name, fields, base_seed, data_type, *bounds),
+            )
+            for data_type, schema, fields in jobs
+            for bounds in shard_bounds(offset, total)
+        ]
+
+        if workers and len(shards) > 1:
+            executor = self.get_executor(workers)
+            futures = [
+                (data_type, executor.submit(_generate_shard_in_worker, *shard))
+                for data_type, shard in shards
+            ]
+            for data_type, future in futures:
+                yield data_type, future.result()
+            return
+
+        for data_type, shard in shards:
+            yield data_type, generate_shard(generator, *shard)
+
+    def generate(self, generator, jobs, total, workers=0, offset=0):
+        grouped_data = {data_type: [] for data_type, *_ in jobs}
+        for data_type, rows in self.iter_shards(
+            generator, jobs, total, workers, offset
+        ):
+            grouped_data[data_type].extend(rows)
+        return grouped_data
+
+
+shard_executor = ShardExecutor()
@@ -8,8 +8,8 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import MethodNotAllowed, NotAuthenticated
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from commons.authentication import CachedJWTAuthentication
 from helpers.unique_id import UniqueId
 
 from .models import Order, Subscription, SubscriptionType
@@ -57,7 +57,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     standard CRUD operations are restricted.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
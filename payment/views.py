@@ -23,8 +23,8 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from commons.authentication import CachedJWTAuthentication
 from order.models import Order
 
 from .models import Order, Payment
@@ -86,7 +86,7 @@ This view ensures that users can only make payments for valid, unpaid orders and
 """,
 )
 class PaymentViewSets(viewsets.ViewSet):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     @action(methods=["get"], detail=False, url_name="payment")
@@ -440,6 +440,7 @@ class PaystackWebhookView(APIView):
                         ).delete()
                         order.paid = True
                         order.user.is_paiduser = True
+                        order.user.save(update_fields=["is_paiduser"])
                         order.end_date = paid_at_datetime + relativedelta(years=1)
                         order.order_status = "Completed"
                         order.save()
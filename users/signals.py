@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from commons.authentication import user_cache
+
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # e.g. the Paystack webhook setting is_paiduser, or a deactivated account
+    if instance.slug:
+        user_cache.invalidate(instance.slug)
@@ -1,3 +1,86 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
 from django.test import TestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from commons.authentication import CachedJWTAuthentication, UserCache
+from commons.shared_store import SharedStore
+
+from .models import User
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        # A private shared store and cache, so tests start empty
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = SharedStore(Path(directory.name) / "shared.sqlite3")
+        for patcher in (
+            mock.patch("commons.authentication.shared_store", store),
+            mock.patch("commons.authentication.user_cache", UserCache(300, 100)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(
+            "alice", "password", slug="alice", email="alice@example.com"
+        )
+        self.authentication = CachedJWTAuthentication()
+
+    def get_user(self, token):
+        validated_token = self.authentication.get_validated_token(str(token))
+        return self.authentication.get_user(validated_token)
+
+    def save(self, user):
+        # Invalidation runs once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+    def test_cache_hit_issues_no_query(self):
+        token = AccessToken.for_user(self.user)
+        with self.assertNumQueries(1):
+            self.get_user(token)
+        with self.assertNumQueries(0):
+            user = self.get_user(token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, "alice@example.com")
+
+    def test_saving_is_paiduser_invalidates_entry(self):
+        token = AccessToken.for_user(self.user)
+        self.assertFalse(self.get_user(token).is_paiduser)
+
+        self.user.is_paiduser = True
+        self.save(self.user)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self.get_user(token).is_paiduser)
+
+    def test_saving_is_active_invalidates_entry(self):
+        token = AccessToken.for_user(self.user)
+        self.get_user(token)
+
+        self.user.is_active = False
+        self.save(self.user)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.get_user(token)
+
+    # Patched on the settings object itself: simplejwt's modules keep a
+    # reference to it, so override_settings wouldn't reach them
+    @mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True)
+    def test_cached_user_rejects_token_issued_before_password_change(self):
+        old_token = AccessToken.for_user(self.user)
+        self.get_user(old_token)
+
+        self.user.set_password("new password")
+        self.save(self.user)
+        # A token issued after the change caches the user again...
+        self.get_user(AccessToken.for_user(self.user))
 
-# Create your tests here.
+        # ...and the cached copy still refuses the old one
+        with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+            self.get_user(old_token)